@@ -0,0 +1,102 @@
+"""
+Benchmark for the SQLite schema migrations
+Times the scheduler, per-server and analytics queries on 1M rows
+before and after the indexes are created
+
+Run from the project root (needs the bot's .env): python -m benchmarks.bench_db_indexes
+"""
+
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from utils.database import CONNECTION_PRAGMAS, create_schema, apply_migrations
+
+ROWS = 1_000_000
+SERVERS = 500
+REPEAT = 20
+
+QUERIES = {
+    'scheduler due posts': (
+        "SELECT * FROM facebook_posts WHERE status = 'scheduled' AND scheduled_at <= ?",
+        lambda now: (now,)
+    ),
+    'server post history': (
+        'SELECT * FROM facebook_posts WHERE server_id = ? ORDER BY created_at DESC LIMIT 20',
+        lambda now: (str(random.randrange(SERVERS)),)
+    ),
+    'post analytics series': (
+        'SELECT fetched_at, post_impressions, post_engaged_users, post_clicks '
+        'FROM facebook_analytics WHERE post_id = ? ORDER BY fetched_at',
+        lambda now: (f'page_{random.randrange(ROWS // 10)}',)
+    ),
+}
+
+
+def populate(conn, now):
+    """Insert ROWS posts (0.1% still scheduled) and ROWS analytics snapshots"""
+    def posts():
+        for i in range(ROWS):
+            created = now - timedelta(minutes=i)
+            if i % 1000 == 0:
+                status, scheduled_at = 'scheduled', now + timedelta(minutes=random.randint(-30, 600))
+            else:
+                status, scheduled_at = 'published', None
+            yield (str(i % SERVERS), 'page', f'page_{i}', 'message', status, 'facebook', scheduled_at, created)
+
+    def snapshots():
+        for i in range(ROWS):
+            yield (f'page_{i % (ROWS // 10)}', str(i % SERVERS), i, i // 2, i // 10, now - timedelta(minutes=i))
+
+    with conn:
+        conn.executemany('''
+            INSERT INTO facebook_posts
+            (server_id, page_id, fb_post_id, message, status, platform, scheduled_at, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', posts())
+        conn.executemany('''
+            INSERT INTO facebook_analytics
+            (post_id, server_id, post_impressions, post_engaged_users, post_clicks, fetched_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', snapshots())
+
+
+def run_queries(conn, now):
+    results = {}
+    for name, (sql, make_args) in QUERIES.items():
+        start = time.perf_counter()
+        for _ in range(REPEAT):
+            conn.execute(sql, make_args(now)).fetchall()
+        results[name] = (time.perf_counter() - start) / REPEAT * 1000
+    return results
+
+
+def main():
+    random.seed(0)
+    now = datetime.utcnow()
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, 'bench.db'))
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        create_schema(conn)
+
+        print(f'Populating {ROWS:,} posts and {ROWS:,} analytics rows...')
+        populate(conn, now)
+
+        before = run_queries(conn, now)
+        start = time.perf_counter()
+        apply_migrations(conn)
+        print(f'Migrations applied in {time.perf_counter() - start:.1f}s')
+        after = run_queries(conn, now)
+
+        print(f"\n{'query':<24}{'full scan':>12}{'indexed':>12}{'speedup':>10}")
+        for name in QUERIES:
+            print(f'{name:<24}{before[name]:>10.2f}ms{after[name]:>10.2f}ms{before[name] / after[name]:>9.0f}x')
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
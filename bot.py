@@ -56,7 +56,8 @@ class SocialMediaBot(commands.Bot):
             'cogs.facebook',
             'cogs.linkedin',
             'cogs.tiktok',
-            'cogs.accounts'
+            'cogs.accounts',
+            'cogs.crosspost'
         ]
 
     async def setup_hook(self):
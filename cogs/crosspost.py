@@ -0,0 +1,98 @@
+"""
+Crosspost Cog - Publish to every connected platform at once
+Each platform cog opts in by defining `platform` and `crosspost()`;
+stubs set `crosspost_available = False` so they aren't counted as publishing
+"""
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+import config
+from utils.crosspost import fan_out
+from utils.publish_queue import publish_queue, PermanentFailure
+
+
+STATUS_LABELS = {
+    'published': 'Published',
+    'skipped': 'Skipped',
+    'failed': 'Failed'
+}
+
+
+class Crosspost(commands.Cog):
+    """Cross-platform publish command"""
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    async def cog_load(self):
+        publish_queue.register('crosspost', self.run_publish_job)
+        publish_queue.start(self.bot)
+
+    async def cog_unload(self):
+        publish_queue.unregister('crosspost')
+
+    def publishers(self):
+        """platform name -> crosspost coroutine for every loaded platform cog"""
+        return {
+            cog.platform: cog.crosspost
+            for cog in self.bot.cogs.values()
+            if hasattr(cog, 'crosspost')
+        }
+
+    @app_commands.command(name="publish", description="Publish the same post to every connected platform")
+    @app_commands.describe(
+        message="Text of the post",
+        image_url="Optional: direct URL to an image (required by Instagram)"
+    )
+    async def publish(self, interaction: discord.Interaction, message: str, image_url: str = None):
+        """Fan one post out to all platforms concurrently"""
+        await interaction.response.defer()
+
+        # Publish in the background; the worker edits this message with the per-platform results
+        available = sum(
+            1 for cog in self.bot.cogs.values()
+            if hasattr(cog, 'crosspost') and getattr(cog, 'crosspost_available', True)
+        )
+        status = await interaction.followup.send(
+            f" Queued for publishing to {available} platforms...", wait=True
+        )
+        await publish_queue.enqueue(interaction, 'crosspost', {
+            'server_id': str(interaction.guild_id),
+            'user_id': str(interaction.user.id),
+            'message': message,
+            'image_url': image_url
+        }, status)
+
+    async def run_publish_job(self, job, report, checkpoint):
+        """Publish a queued /publish everywhere and return the reply as (content, embed)"""
+        if job.get('started'):
+            # A worker died mid fan-out; some platforms may already have the post
+            raise PermanentFailure("Publishing was interrupted, check each platform before posting again")
+        await checkpoint(started=True)
+
+        message, image_url = job['message'], job.get('image_url')
+        results = await fan_out(self.publishers(), job['server_id'], job['user_id'], message, image_url)
+        published = sum(1 for _, status, _, _ in results if status == 'published')
+        failed = sum(1 for _, status, _, _ in results if status == 'failed')
+
+        embed = discord.Embed(
+            title=f" Published to {published} of {len(results)} platforms",
+            description=message[:300] + ('...' if len(message) > 300 else ''),
+            color=config.COLOR_SUCCESS if not failed else config.COLOR_WARNING if published else config.COLOR_ERROR
+        )
+        if image_url:
+            embed.set_thumbnail(url=image_url)
+        for platform, status, detail, seconds in sorted(results):
+            embed.add_field(
+                name=f"{platform}: {STATUS_LABELS[status]} ({seconds:.1f}s)",
+                value=(detail or '-')[:1024],
+                inline=False
+            )
+        if results:
+            embed.set_footer(text=f"Total {max(seconds for *_, seconds in results):.1f}s, platforms ran in parallel")
+        return None, embed
+
+
+async def setup(bot):
+    await bot.add_cog(Crosspost(bot))
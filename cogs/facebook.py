@@ -6,9 +6,9 @@ All Facebook commands and functionality
 import discord
 from discord import app_commands
 from discord.ext import commands
-import aiohttp
-from datetime import datetime
+from datetime import datetime, timedelta
 import asyncio
+import aiohttp
 import sys
 import os
 
@@ -17,16 +17,31 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.database import db
 from utils.oauth import oauth
+from utils.graph import graph
+from utils.batch import batcher
 from utils.scheduler import scheduler
+from utils.ratelimit import RateLimiter
+from utils.singleflight import SingleFlight
+from utils.response_cache import response_cache, cached_footer
+from utils.paging import paginate
+from utils.publish_queue import publish_queue, PermanentFailure
+from utils.crosspost import PlatformSkipped
+from utils.insights import insights_collector
+from utils.retention import retention
+from utils.analytics import build_report
 import config
 
 
 class Facebook(commands.Cog):
     """Facebook Page commands for Discord bot"""
     
+    platform = 'Facebook'
+    
     def __init__(self, bot):
         self.bot = bot
         self.rate_limiter = RateLimiter()
+        self.inflight = SingleFlight()
+        self.refreshes = set()
         print(' Facebook cog initialized')
     
 
@@ -46,8 +61,25 @@ class Facebook(commands.Cog):
         scheduler.schedule_check(db)
         scheduler.start()
         
+        publish_queue.register('facebook_post', self.run_post_job)
+        publish_queue.register('facebook_photo', self.run_photo_job)
+        publish_queue.start(self.bot)
+        
+        insights_collector.set_fetch_callback(self.collect_insights, self.rate_limiter.spare)
+        insights_collector.start(db)
+        retention.start(db)
+        
         print(' Facebook cog loaded successfully')
     
+    async def cog_unload(self):
+        """Stop background work, then close the shared Graph session when cog unloads"""
+        scheduler.stop()
+        publish_queue.unregister('facebook_post')
+        publish_queue.unregister('facebook_photo')
+        insights_collector.stop()
+        retention.stop()
+        await graph.close()
+    
     @app_commands.command(name="fb-connect", description="Connect your Facebook Page")
 
 
@@ -59,7 +91,7 @@ class Facebook(commands.Cog):
         server_id = str(interaction.guild_id)
         
         # Check if already connected
-        existing = db.get_facebook_account(server_id)
+        existing = await db.get_facebook_account(server_id)
         if existing:
             await interaction.response.send_message(
                 f" Already connected to **{existing.get('page_name', 'Facebook Page')}**!\nUse `/fb-disconnect` to reconnect.",
@@ -112,7 +144,7 @@ class Facebook(commands.Cog):
                 info_msg = f"Connected to: **{selected_page['name']}**"
             
             # Save page account
-            db.save_facebook_account(server_id, {
+            await db.save_facebook_account(server_id, {
                 'page_id': selected_page['id'],
                 'page_name': selected_page['name'],
                 'access_token': selected_page['access_token']
@@ -155,7 +187,7 @@ class Facebook(commands.Cog):
         """Disconnect Facebook Page"""
         server_id = str(interaction.guild_id)
         
-        account = db.get_facebook_account(server_id)
+        account = await db.get_facebook_account(server_id)
         if not account:
             await interaction.response.send_message(
                 " No Facebook Page connected.\n\nUse `/fb-connect` to connect a page.",
@@ -164,7 +196,7 @@ class Facebook(commands.Cog):
             return
         
         page_name = account.get('page_name', 'Facebook Page')
-        db.delete_facebook_account(server_id)
+        await db.delete_facebook_account(server_id)
         
         embed = discord.Embed(
             title=" Facebook Page Disconnected",
@@ -191,7 +223,7 @@ class Facebook(commands.Cog):
         await interaction.response.defer()
         
         server_id = str(interaction.guild_id)
-        account = db.get_facebook_account(server_id)
+        account = await db.get_facebook_account(server_id)
         
         if not account:
             await interaction.followup.send(
@@ -199,50 +231,13 @@ class Facebook(commands.Cog):
             )
             return
         
-        try:
-            # Rate limit check
-            await self.rate_limiter.wait()
-            
-            # Post to Facebook
-            post_id = await self.create_post(
-                account['page_id'],
-                account['access_token'],
-                message,
-                link
-            )
-            
-            # Save to database
-            db.save_facebook_post({
-                'server_id': server_id,
-                'page_id': account['page_id'],
-                'fb_post_id': post_id,
-                'message': message,
-                'link': link,
-                'status': 'published',
-                'platform': 'facebook'
-            })
-            
-            # Success message
-            embed = discord.Embed(
-                title=" Posted to Facebook!",
-                description=message[:300] + ('...' if len(message) > 300 else ''),
-                color=config.COLOR_SUCCESS
-            )
-            embed.add_field(name="Page", value=account['page_name'], inline=True)
-            embed.add_field(name="Post ID", value=post_id.split('_')[1][:10] + '...', inline=True)
-            if link:
-                embed.add_field(name="Link", value=link, inline=False)
-            embed.set_footer(text=f"Posted at {datetime.utcnow().strftime('%Y-%m-%d %H:%M UTC')}")
-            
-            await interaction.followup.send(embed=embed)
-            
-        except Exception as e:
-            error_embed = discord.Embed(
-                title=" Posting Failed",
-                description=f"Error: {str(e)}",
-                color=config.COLOR_ERROR
-            )
-            await interaction.followup.send(embed=error_embed)
+        # Publish in the background; the worker edits this message with the result
+        status = await interaction.followup.send(f" Queued for posting to **{account['page_name']}**...", wait=True)
+        await publish_queue.enqueue(interaction, 'facebook_post', {
+            'server_id': server_id,
+            'message': message,
+            'link': link
+        }, status)
     
     @app_commands.command(name="fb-post-image", description="Post image to Facebook Page")
     @app_commands.describe(
@@ -258,47 +253,18 @@ class Facebook(commands.Cog):
         await interaction.response.defer()
         
         server_id = str(interaction.guild_id)
-        account = db.get_facebook_account(server_id)
+        account = await db.get_facebook_account(server_id)
         
         if not account:
             await interaction.followup.send("No Facebook Page connected. Use `/fb-connect` first.")
             return
         
-        try:
-            await self.rate_limiter.wait()
-            
-            # Post image
-            post_id = await self.post_photo(
-                account['page_id'],
-                account['access_token'],
-                image_url,
-                caption
-            )
-            
-            # Save to database
-            db.save_facebook_post({
-                'server_id': server_id,
-                'page_id': account['page_id'],
-                'fb_post_id': post_id,
-                'message': caption,
-                'image_url': image_url,
-                'status': 'published',
-                'platform': 'facebook'
-            })
-            
-            embed = discord.Embed(
-                title=" Image Posted to Facebook!",
-                description=caption[:200] if caption else "No caption",
-                color=config.COLOR_SUCCESS
-            )
-            embed.set_thumbnail(url=image_url)
-            embed.add_field(name="Page", value=account['page_name'])
-            embed.add_field(name="Post ID", value=post_id.split('_')[1][:10] + '...')
-            
-            await interaction.followup.send(embed=embed)
-            
-        except Exception as e:
-            await interaction.followup.send(f" Error posting image: {str(e)}")
+        status = await interaction.followup.send(f" Queued image for **{account['page_name']}**...", wait=True)
+        await publish_queue.enqueue(interaction, 'facebook_photo', {
+            'server_id': server_id,
+            'image_url': image_url,
+            'caption': caption
+        }, status)
     
     @app_commands.command(name="fb-schedule", description="Schedule a Facebook post for later")
     @app_commands.describe(
@@ -314,7 +280,7 @@ class Facebook(commands.Cog):
     async def schedule(self, interaction: discord.Interaction, message: str, datetime_str: str, link: str = None):
         """Schedule a Facebook post"""
         server_id = str(interaction.guild_id)
-        account = db.get_facebook_account(server_id)
+        account = await db.get_facebook_account(server_id)
         
         if not account:
             await interaction.response.send_message(
@@ -336,7 +302,7 @@ class Facebook(commands.Cog):
                 return
             
             # Save scheduled post
-            post_id = db.save_facebook_post({
+            post_id = await db.save_facebook_post({
                 'server_id': server_id,
                 'page_id': account['page_id'],
                 'message': message,
@@ -345,6 +311,7 @@ class Facebook(commands.Cog):
                 'status': 'scheduled',
                 'platform': 'facebook'
             })
+            scheduler.notify(post_id, scheduled_at)
             
             embed = discord.Embed(
                 title=" Facebook Post Scheduled!",
@@ -375,7 +342,7 @@ class Facebook(commands.Cog):
             )
     
     @app_commands.command(name="fb-recent", description="View recent posts from your Facebook Page")
-    @app_commands.describe(count="Number of posts to show (max 100, default 10)")
+    @app_commands.describe(count=f"Number of recent posts to include (max {config.FACEBOOK_FEED_MAX_POSTS}, default 10)")
 
 
 
@@ -383,68 +350,29 @@ class Facebook(commands.Cog):
 
 
 
-    async def recent(self, interaction: discord.Interaction, count: int = 10):
+    async def recent(self, interaction: discord.Interaction, count: app_commands.Range[int, 1, config.FACEBOOK_FEED_MAX_POSTS] = 10):
         """Get recent posts from Facebook Page"""
         await interaction.response.defer()
         
         server_id = str(interaction.guild_id)
-        account = db.get_facebook_account(server_id)
+        account = await db.get_facebook_account(server_id)
         
         if not account:
             await interaction.followup.send(" No Facebook Page connected. Use `/fb-connect` first.")
             return
         
         try:
-            await self.rate_limiter.wait()
-            
-            url = f"{config.FACEBOOK_GRAPH_URL}/{account['page_id']}/feed"
-            params = {
-                'fields': 'id,message,created_time,permalink_url,shares,likes.summary(true),comments.summary(true)',
-                'limit': min(count, 100),
-                'access_token': account['access_token']
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params) as resp:
-                    if resp.status != 200:
-                        raise Exception(await resp.text())
-                    
-                    data = await resp.json()
-                    posts = data.get('data', [])
-                    
-                    if not posts:
-                        await interaction.followup.send("📭 No posts found on this page")
-                        return
-                    
-                    embed = discord.Embed(
-                        title=f" Recent Facebook Posts",
-                        description=f"From **{account['page_name']}** ({len(posts)} posts)",
-                        color=config.COLOR_FACEBOOK
-                    )
-                    
-                    for i, post in enumerate(posts[:5], 1):
-                        message = post.get('message', 'No text')[:100]
-                        likes = post.get('likes', {}).get('summary', {}).get('total_count', 0)
-                        comments = post.get('comments', {}).get('summary', {}).get('total_count', 0)
-                        shares = post.get('shares', {}).get('count', 0)
-                        created = post.get('created_time', '')[:10]
-                        
-                        embed.add_field(
-                            name=f"{i}. Post from {created}",
-                            value=f"{message}{'...' if len(post.get('message', '')) > 100 else ''}\n\nLikes: {likes} | Comments: {comments} | Shares: {shares}\n[View Post]({post.get('permalink_url', '#')})",
-                            inline=False
-                        )
-                    
-                    if len(posts) > 5:
-                        embed.set_footer(text=f"Showing 5 of {len(posts)} posts")
-                    
-                    await interaction.followup.send(embed=embed)
-        
+            await self.send_with_refresh(
+                interaction, 'feed', account, count,
+                lambda refresh: self.fetch_feed(account, count, refresh),
+                lambda posts, age: self.feed_message(account, posts, age)
+            )
+
         except Exception as e:
             await interaction.followup.send(f" Error fetching posts: {str(e)}")
     
-    @app_commands.command(name="fb-stats", description="Get analytics for a Facebook post")
-    @app_commands.describe(post_id="Facebook post ID (format: 123456789_987654321)")
+    @app_commands.command(name="fb-stats", description="Get analytics for one or more Facebook posts")
+    @app_commands.describe(post_id="Facebook post ID(s), separated by spaces or commas (format: 123456789_987654321)")
 
 
 
@@ -456,85 +384,207 @@ class Facebook(commands.Cog):
         await interaction.response.defer()
         
         server_id = str(interaction.guild_id)
-        account = db.get_facebook_account(server_id)
+        account = await db.get_facebook_account(server_id)
         
         if not account:
             await interaction.followup.send(" No Facebook Page connected. Use `/fb-connect` first.")
             return
         
+        post_ids = list(dict.fromkeys(post_id.replace(',', ' ').split()))[:config.FACEBOOK_STATS_MAX_POSTS]
+        if not post_ids:
+            await interaction.followup.send(
+                " No post ID given.\n\n**Usage:** `/fb-stats post_id:123456789_987654321`\n"
+                "Separate several IDs with spaces or commas"
+            )
+            return
+
         try:
-            await self.rate_limiter.wait()
+            # Get post insights (fetched together in one batch request)
+            fetched = await asyncio.gather(*(self.fetch_insights(account, pid) for pid in post_ids))
+            results = [insights for insights, _ in fetched]
+            ages = [age for _, age in fetched if age is not None]
+            footer = cached_footer(max(ages)) if ages else f"Data fetched at {datetime.utcnow().strftime('%Y-%m-%d %H:%M UTC')}"
             
-            # Get post insights
-            url = f"{config.FACEBOOK_GRAPH_URL}/{post_id}/insights"
-            params = {
-                'metric': 'post_impressions,post_engaged_users,post_clicks,post_reactions_by_type_total',
-                'access_token': account['access_token']
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params) as resp:
-                    if resp.status != 200:
-                        error = await resp.text()
-                        raise Exception(f"API error: {error}")
-                    
-                    data = await resp.json()
-                    insights = {}
-                    
-                    for item in data.get('data', []):
-                        metric_name = item['name']
-                        value = item['values'][0]['value']
-                        insights[metric_name] = value
-                    
-                    # Save analytics
-                    db.save_facebook_analytics({
-                        'post_id': post_id,
+            # Save analytics (cached answers were already saved when fetched)
+            for pid, (insights, age) in zip(post_ids, fetched):
+                if age is None:
+                    await db.save_facebook_analytics({
+                        'post_id': pid,
                         'server_id': server_id,
                         **insights
                     })
-                    
-                    # Create analytics embed
-                    embed = discord.Embed(
-                        title=" Facebook Post Analytics",
-                        description=f"Statistics for post: `{post_id}`",
-                        color=config.COLOR_FACEBOOK
-                    )
-                    
-                    embed.add_field(
-                        name=" Impressions",
-                        value=f"{insights.get('post_impressions', 0):,}",
-                        inline=True
-                    )
-                    embed.add_field(
-                        name=" Engaged Users",
-                        value=f"{insights.get('post_engaged_users', 0):,}",
-                        inline=True
-                    )
+            
+            if len(post_ids) > 1:
+                embed = discord.Embed(
+                    title=" Facebook Post Analytics",
+                    description=f"Statistics for {len(post_ids)} posts",
+                    color=config.COLOR_FACEBOOK
+                )
+                for pid, insights in zip(post_ids, results):
                     embed.add_field(
-                        name=" Clicks",
-                        value=f"{insights.get('post_clicks', 0):,}",
-                        inline=True
+                        name=f"`{pid}`",
+                        value=f"Impressions: {insights.get('post_impressions', 0):,} | "
+                              f"Engaged: {insights.get('post_engaged_users', 0):,} | "
+                              f"Clicks: {insights.get('post_clicks', 0):,}",
+                        inline=False
                     )
-                    
-                    # Reactions breakdown
-                    reactions = insights.get('post_reactions_by_type_total', {})
-                    if reactions:
-                        reaction_str = ' | '.join([f"{k}: {v}" for k, v in reactions.items()])
-                        embed.add_field(
-                            name=" Reactions Breakdown",
-                            value=reaction_str,
-                            inline=False
-                        )
-                    
-                    embed.set_footer(text=f"Data fetched at {datetime.utcnow().strftime('%Y-%m-%d %H:%M UTC')}")
-                    
-                    await interaction.followup.send(embed=embed)
-        
+                embed.set_footer(text=footer)
+                await interaction.followup.send(embed=embed)
+                return
+            
+            post_id, insights = post_ids[0], results[0]
+            
+            # Create analytics embed
+            embed = discord.Embed(
+                title=" Facebook Post Analytics",
+                description=f"Statistics for post: `{post_id}`",
+                color=config.COLOR_FACEBOOK
+            )
+            
+            embed.add_field(
+                name=" Impressions",
+                value=f"{insights.get('post_impressions', 0):,}",
+                inline=True
+            )
+            embed.add_field(
+                name=" Engaged Users",
+                value=f"{insights.get('post_engaged_users', 0):,}",
+                inline=True
+            )
+            embed.add_field(
+                name=" Clicks",
+                value=f"{insights.get('post_clicks', 0):,}",
+                inline=True
+            )
+            
+            # Reactions breakdown
+            reactions = insights.get('post_reactions_by_type_total', {})
+            if reactions:
+                reaction_str = ' | '.join([f"{k}: {v}" for k, v in reactions.items()])
+                embed.add_field(
+                    name=" Reactions Breakdown",
+                    value=reaction_str,
+                    inline=False
+                )
+            
+            embed.set_footer(text=footer)
+            
+            await interaction.followup.send(embed=embed)
+
         except Exception as e:
             await interaction.followup.send(
                 f" Error fetching analytics: {str(e)}\n\nMake sure:\n• Post ID is correct (format: 123_456)\n• Post belongs to your connected page"
             )
     
+    @app_commands.command(name="fb-report", description="Analytics report for your page's posts")
+    @app_commands.describe(days="How many days of snapshots to include (default 30)")
+    async def report(self, interaction: discord.Interaction, days: int = 30):
+        """Roll up stored analytics snapshots into a page report"""
+        await interaction.response.defer()
+        
+        server_id = str(interaction.guild_id)
+        days = max(1, min(days, config.FACEBOOK_REPORT_MAX_DAYS))
+        since = datetime.utcnow() - timedelta(days=days)
+        
+        try:
+            report = await db.read(build_report, server_id, since)
+        except Exception as e:
+            await interaction.followup.send(f" Error building report: {str(e)}")
+            return
+        
+        if not report:
+            await interaction.followup.send("📭 No analytics collected in this period yet")
+            return
+        
+        totals, growth = report['totals'], report['growth']
+        embed = discord.Embed(
+            title=f" Page Report: last {days} days",
+            description=f"{report['posts']:,} posts from {report['snapshots']:,} snapshots",
+            color=config.COLOR_FACEBOOK
+        )
+        embed.add_field(
+            name="Totals",
+            value=f"Impressions: {totals['impressions']:,} (+{growth['impressions']:,})\n"
+                  f"Engaged Users: {totals['engaged']:,} (+{growth['engaged']:,})\n"
+                  f"Clicks: {totals['clicks']:,} (+{growth['clicks']:,})",
+            inline=True
+        )
+        percentiles = report['impression_percentiles']
+        embed.add_field(
+            name="Impressions per Post",
+            value="\n".join(f"p{p}: {value:,.0f}" for p, value in percentiles.items())
+                  + f"\nMedian engagement: {report['median_engagement_rate']:.1%}",
+            inline=True
+        )
+        if report['weekday_engagement']:
+            embed.add_field(
+                name="Engagement Rate by Weekday Posted",
+                value=" | ".join(f"{day} {rate:.1%}" for day, rate in report['weekday_engagement'].items()),
+                inline=False
+            )
+        for i, post in enumerate(report['top_posts'], 1):
+            message = (post['message'] or 'No text')[:80]
+            embed.add_field(
+                name=f"{i}. {post['engaged']:,} engaged, {post['impressions']:,} impressions",
+                value=f"{message}\n`{post['fb_post_id']}` (+{post['growth']:,} engaged in period)",
+                inline=False
+            )
+        embed.set_footer(text="From stored snapshots, no live API calls")
+        
+        await interaction.followup.send(embed=embed)
+    
+    @app_commands.command(name="fb-trend", description="Daily growth of your page's tracked posts")
+    @app_commands.describe(days="How many days to list (default 14)")
+    async def trend(self, interaction: discord.Interaction, days: int = 14):
+        """Day-by-day growth from the materialized daily aggregates"""
+        await interaction.response.defer()
+        
+        server_id = str(interaction.guild_id)
+        days = max(1, min(days, config.FACEBOOK_TREND_MAX_DAYS))
+        since_day = (datetime.utcnow() - timedelta(days=days - 1)).date().isoformat()
+        
+        try:
+            rows = await db.get_facebook_daily_analytics(server_id, since_day)
+            totals = await db.get_facebook_analytics_totals(server_id)
+        except Exception as e:
+            await interaction.followup.send(f" Error loading trend: {str(e)}")
+            return
+        
+        if not rows:
+            await interaction.followup.send("📭 No analytics collected in this period yet")
+            return
+        
+        lines = [f"{'Day':<10} {'Impr.':>9} {'Engaged':>8} {'Clicks':>7} {'React.':>7}"]
+        for row in rows:
+            lines.append(
+                f"{row['day']:<10} {row['impressions']:>+9,} {row['engaged']:>+8,} "
+                f"{row['clicks']:>+7,} {row['reactions']:>+7,}"
+            )
+        best = max(rows, key=lambda row: row['engaged'])
+        
+        embed = discord.Embed(
+            title=f" Daily Growth: last {days} days",
+            description="```\n" + "\n".join(lines) + "\n```",
+            color=config.COLOR_FACEBOOK
+        )
+        embed.add_field(
+            name="Period",
+            value=f"Impressions: +{sum(row['impressions'] for row in rows):,}\n"
+                  f"Engaged Users: +{sum(row['engaged'] for row in rows):,}\n"
+                  f"Best day: {best['day']} (+{best['engaged']:,} engaged)",
+            inline=True
+        )
+        embed.add_field(
+            name=f"Lifetime ({totals['posts']:,} posts)",
+            value=f"Impressions: {totals['impressions']:,}\n"
+                  f"Engaged Users: {totals['engaged']:,}\n"
+                  f"Reactions: {totals['reactions']:,}",
+            inline=True
+        )
+        embed.set_footer(text="Growth between snapshots, credited to the day it was seen")
+        
+        await interaction.followup.send(embed=embed)
+    
     @app_commands.command(name="fb-delete", description="Delete a Facebook post")
     @app_commands.describe(post_id="Facebook post ID to delete")
 
@@ -547,30 +597,28 @@ class Facebook(commands.Cog):
         await interaction.response.defer()
         
         server_id = str(interaction.guild_id)
-        account = db.get_facebook_account(server_id)
+        account = await db.get_facebook_account(server_id)
         
         if not account:
             await interaction.followup.send("No Facebook Page connected. Use `/fb-connect` first.")
             return
         
         try:
-            await self.rate_limiter.wait()
-            
             url = f"{config.FACEBOOK_GRAPH_URL}/{post_id}"
             params = {'access_token': account['access_token']}
             
-            async with aiohttp.ClientSession() as session:
-                async with session.delete(url, params=params) as resp:
-                    if resp.status == 200:
-                        embed = discord.Embed(
-                            title=" Post Deleted",
-                            description=f"Successfully deleted post: `{post_id}`",
-                            color=config.COLOR_SUCCESS
-                        )
-                        await interaction.followup.send(embed=embed)
-                    else:
-                        error = await resp.text()
-                        raise Exception(error)
+            resp = await self.graph_request('DELETE', url, account['page_id'], params)
+            if resp.status == 200:
+                await response_cache.invalidate('feed', account['page_id'])
+                await response_cache.invalidate('insights', account['page_id'], post_id)
+                embed = discord.Embed(
+                    title=" Post Deleted",
+                    description=f"Successfully deleted post: `{post_id}`",
+                    color=config.COLOR_SUCCESS
+                )
+                await interaction.followup.send(embed=embed)
+            else:
+                raise Exception(resp.text)
         
         except Exception as e:
             await interaction.followup.send(f" Error deleting post: {str(e)}")
@@ -585,66 +633,230 @@ class Facebook(commands.Cog):
         await interaction.response.defer()
         
         server_id = str(interaction.guild_id)
-        account = db.get_facebook_account(server_id)
+        account = await db.get_facebook_account(server_id)
         
         if not account:
             await interaction.followup.send(" No Facebook Page connected. Use `/fb-connect` first.")
             return
         
         try:
-            await self.rate_limiter.wait()
-            
-            url = f"{config.FACEBOOK_GRAPH_URL}/{account['page_id']}"
-            params = {
-                'fields': 'id,name,fan_count,followers_count,category,about,website',
-                'access_token': account['access_token']
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params) as resp:
-                    if resp.status != 200:
-                        raise Exception(await resp.text())
-                    
-                    page_data = await resp.json()
-                    
-                    embed = discord.Embed(
-                        title=f" {page_data.get('name', 'Facebook Page')}",
-                        description=page_data.get('about', 'No description'),
-                        color=config.COLOR_FACEBOOK,
-                        url=page_data.get('website', f"https://facebook.com/{page_data['id']}")
-                    )
-                    
-                    embed.add_field(
-                        name="Fans/Likes",
-                        value=f"{page_data.get('fan_count', 0):,}",
-                        inline=True
-                    )
-                    embed.add_field(
-                        name=" Followers",
-                        value=f"{page_data.get('followers_count', 0):,}",
-                        inline=True
-                    )
-                    embed.add_field(
-                        name=" Category",
-                        value=page_data.get('category', 'Unknown'),
-                        inline=True
-                    )
-                    embed.add_field(
-                        name=" Page ID",
-                        value=page_data['id'],
-                        inline=False
-                    )
-                    
-                    await interaction.followup.send(embed=embed)
-        
+            await self.send_with_refresh(
+                interaction, 'page_info', account, '',
+                lambda refresh: self.fetch_page_info(account, refresh),
+                self.page_info_message
+            )
+
         except Exception as e:
             await interaction.followup.send(f" Error fetching page info: {str(e)}")
     
     # Helper Methods
+    async def send_with_refresh(self, interaction, kind, account, key, fetch, render):
+        """Reply from the last snapshot right away, then edit in fresh data (stale-while-revalidate)"""
+        cached = await response_cache.get(kind, account['page_id'], key, stale=True)
+        if cached is None:
+            data, age = await fetch(False)
+            content, embed = render(data, age)
+            await interaction.followup.send(content=content, embed=embed)
+            return
+        
+        data, age = cached
+        content, embed = render(data, age)
+        message = await interaction.followup.send(content=content, embed=embed, wait=True)
+        if response_cache.is_fresh(kind, age):
+            return
+        
+        async def refresh():
+            try:
+                data, _ = await fetch(True)
+                content, embed = render(data, None)
+                await message.edit(content=content, embed=embed)
+            except Exception as e:
+                print(f' Error refreshing {kind} for page {account["page_id"]}: {e}')
+        
+        task = asyncio.create_task(refresh())
+        self.refreshes.add(task)
+        task.add_done_callback(self.refreshes.discard)
+    
+    def feed_message(self, account, feed, age):
+        """Build the /fb-recent reply as (content, embed)"""
+        posts = feed['posts']
+        if not posts:
+            return "📭 No posts found on this page", None
+        
+        embed = discord.Embed(
+            title=f" Recent Facebook Posts",
+            description=f"From **{account['page_name']}** ({feed['count']} posts)",
+            color=config.COLOR_FACEBOOK
+        )
+        
+        for i, post in enumerate(posts, 1):
+            message = post.get('message', 'No text')[:100]
+            likes = post.get('likes', {}).get('summary', {}).get('total_count', 0)
+            comments = post.get('comments', {}).get('summary', {}).get('total_count', 0)
+            shares = post.get('shares', {}).get('count', 0)
+            created = post.get('created_time', '')[:10]
+            
+            embed.add_field(
+                name=f"{i}. Post from {created}",
+                value=f"{message}{'...' if len(post.get('message', '')) > 100 else ''}\n\nLikes: {likes} | Comments: {comments} | Shares: {shares}\n[View Post]({post.get('permalink_url', '#')})",
+                inline=False
+            )
+        
+        footer = []
+        if feed['count'] > len(posts):
+            embed.add_field(
+                name=f"Totals across {feed['count']} posts",
+                value=f"Likes: {feed['likes']:,} | Comments: {feed['comments']:,} | Shares: {feed['shares']:,}",
+                inline=False
+            )
+            footer.append(f"Showing {len(posts)} of {feed['count']} posts")
+        if age is not None:
+            footer.append(cached_footer(age))
+        if footer:
+            embed.set_footer(text=' • '.join(footer))
+        return None, embed
+    
+    def page_info_message(self, page_data, age):
+        """Build the /fb-page-info reply as (content, embed)"""
+        embed = discord.Embed(
+            title=f" {page_data.get('name', 'Facebook Page')}",
+            description=page_data.get('about', 'No description'),
+            color=config.COLOR_FACEBOOK,
+            url=page_data.get('website', f"https://facebook.com/{page_data['id']}")
+        )
+        
+        embed.add_field(
+            name="Fans/Likes",
+            value=f"{page_data.get('fan_count', 0):,}",
+            inline=True
+        )
+        embed.add_field(
+            name=" Followers",
+            value=f"{page_data.get('followers_count', 0):,}",
+            inline=True
+        )
+        embed.add_field(
+            name=" Category",
+            value=page_data.get('category', 'Unknown'),
+            inline=True
+        )
+        embed.add_field(
+            name=" Page ID",
+            value=page_data['id'],
+            inline=False
+        )
+        if age is not None:
+            embed.set_footer(text=cached_footer(age))
+        return None, embed
+    
+    async def graph_request(self, method, url, page_id, params=None):
+        """Send a paced Graph request; identical concurrent reads share one call"""
+        if method != 'GET':
+            return await self._send_graph_request(method, url, page_id, params)
+        
+        key = (url, page_id, tuple(sorted(
+            (name, str(value)) for name, value in (params or {}).items() if name != 'access_token'
+        )))
+        return await self.inflight.do(key, lambda: self._send_graph_request(method, url, page_id, params))
+    
+    async def _send_graph_request(self, method, url, page_id, params=None):
+        await self.rate_limiter.wait(page_id)
+        if method == 'GET':
+            # Concurrent reads share one round trip via the batch endpoint
+            resp = await batcher.get(url, params)
+        else:
+            resp = await graph.request(method, url, params=params)
+        self.rate_limiter.observe(page_id, resp)
+        return resp
+    
+    async def fetch_page_info(self, account, refresh=False):
+        """Get page details as (data, cached_age); age is None when fetched live"""
+        cached = None if refresh else await response_cache.get('page_info', account['page_id'])
+        if cached:
+            return cached
+        
+        url = f"{config.FACEBOOK_GRAPH_URL}/{account['page_id']}"
+        params = {
+            'fields': 'id,name,fan_count,followers_count,category,about,website',
+            'access_token': account['access_token']
+        }
+        
+        resp = await self.graph_request('GET', url, account['page_id'], params)
+        if resp.status != 200:
+            raise Exception(resp.text)
+        
+        page_data = resp.json()
+        await response_cache.set('page_info', account['page_id'], '', page_data)
+        return page_data, None
+    
+    async def fetch_feed(self, account, count, refresh=False):
+        """Get a summary of the page's latest posts as (feed, cached_age)"""
+        count = min(count, config.FACEBOOK_FEED_MAX_POSTS)
+        cached = None if refresh else await response_cache.get('feed', account['page_id'], count)
+        if cached:
+            return cached
+        
+        # Stream the feed so large counts never hold more than two pages in memory
+        feed = {'posts': [], 'count': 0, 'likes': 0, 'comments': 0, 'shares': 0}
+        async for post in self.iter_feed(account, count):
+            if len(feed['posts']) < 5:
+                feed['posts'].append(post)
+            feed['count'] += 1
+            feed['likes'] += post.get('likes', {}).get('summary', {}).get('total_count', 0)
+            feed['comments'] += post.get('comments', {}).get('summary', {}).get('total_count', 0)
+            feed['shares'] += post.get('shares', {}).get('count', 0)
+        
+        await response_cache.set('feed', account['page_id'], count, feed)
+        return feed, None
+    
+    def iter_feed(self, account, limit=None):
+        """Stream the page's posts newest first, following paging cursors"""
+        url = f"{config.FACEBOOK_GRAPH_URL}/{account['page_id']}/feed"
+        params = {
+            'fields': 'id,message,created_time,permalink_url,shares,likes.summary(true),comments.summary(true)',
+            'limit': min(limit or config.GRAPH_PAGE_SIZE, config.GRAPH_PAGE_SIZE),
+            'access_token': account['access_token']
+        }
+        
+        async def fetch(page_params):
+            resp = await self.graph_request('GET', url, account['page_id'], page_params)
+            if resp.status != 200:
+                raise Exception(resp.text)
+            return resp.json()
+        
+        return paginate(fetch, params, limit)
+    
+    async def fetch_insights(self, account, post_id, refresh=False):
+        """Get the lifetime insights of one post as (metric -> value dict, cached_age)"""
+        cached = None if refresh else await response_cache.get('insights', account['page_id'], post_id)
+        if cached:
+            return cached
+        
+        url = f"{config.FACEBOOK_GRAPH_URL}/{post_id}/insights"
+        params = {
+            'metric': 'post_impressions,post_engaged_users,post_clicks,post_reactions_by_type_total',
+            'access_token': account['access_token']
+        }
+        
+        resp = await self.graph_request('GET', url, account['page_id'], params)
+        if resp.status != 200:
+            raise Exception(f"API error: {resp.text}")
+        
+        insights = {}
+        for item in resp.json().get('data', []):
+            insights[item['name']] = item['values'][0]['value']
+        await response_cache.set('insights', account['page_id'], post_id, insights)
+        return insights, None
+    
 
 
 
 
+    async def collect_insights(self, account, post_id):
+        """Live insights for the background collector"""
+        insights, _ = await self.fetch_insights(account, post_id, refresh=True)
+        return insights
+    
     async def create_post(self, page_id, access_token, message, link=None):
         """Create a text post on Facebook Page"""
         url = f"{config.FACEBOOK_GRAPH_URL}/{page_id}/feed"
@@ -656,14 +868,11 @@ class Facebook(commands.Cog):
         if link:
             params['link'] = link
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, params=params) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    return data['id']
-                else:
-                    error = await resp.text()
-                    raise Exception(f"Post failed: {error}")
+        resp = await self.graph_request('POST', url, page_id, params)
+        if resp.status == 200:
+            await response_cache.invalidate('feed', page_id)
+            return resp.json()['id']
+        raise Exception(f"Post failed: {resp.text}")
     
 
 
@@ -680,69 +889,153 @@ class Facebook(commands.Cog):
         if caption:
             params['caption'] = caption
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, params=params) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    return data['id']
-                else:
-                    error = await resp.text()
-                    raise Exception(f"Image post failed: {error}")
+        resp = await self.graph_request('POST', url, page_id, params)
+        if resp.status == 200:
+            await response_cache.invalidate('feed', page_id)
+            # `id` is the bare photo ID; insights and the feed need the page post ID
+            data = resp.json()
+            return data.get('post_id') or data['id']
+        raise Exception(f"Image post failed: {resp.text}")
     
 
 
 
     
-    async def publish_scheduled_post(self, post):
-        """Publish a scheduled Facebook post"""
+    async def publish_once(self, job, checkpoint, publish):
+        """Run a job's upstream write at most once and return the new post's ID"""
+        if job.get('fb_post_id'):
+            # Facebook accepted it on an earlier attempt, only the follow-up failed
+            return job['fb_post_id']
         try:
-            account = db.get_facebook_account(post['server_id'])
-            if not account:
-                db.update_facebook_post_status(post['_id'], 'failed')
-                print(f" No account found for server {post['server_id']}")
-                return
-            
-            await self.rate_limiter.wait()
-            
-            # Post to Facebook
-            post_id = await self.create_post(
-                post['page_id'],
-                account['access_token'],
-                post['message'],
-                post.get('link')
+            post_id = await publish()
+        except aiohttp.ClientConnectorError:
+            raise  # never reached Facebook, safe to retry
+        except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+            raise PermanentFailure(
+                f"No answer from Facebook ({e!r}), the post may have gone out. Check the page before posting again"
             )
-            
-            db.update_facebook_post_status(post['_id'], 'published', post_id)
-            print(f' Published scheduled Facebook post: {post_id}')
-            
-        except Exception as e:
-            print(f' Failed to publish scheduled post {post.get("_id")}: {e}')
-            db.update_facebook_post_status(post['_id'], 'failed')
-
-
-class RateLimiter:
-    """Rate limiter for Facebook API"""
-    def __init__(self):
-        self.calls = []
-        self.max_calls = config.FACEBOOK_MAX_CALLS
-        self.window = config.RATE_LIMIT_WINDOW
+        await checkpoint(fb_post_id=post_id)
+        return post_id
+    
+    async def save_once(self, job, checkpoint, post_data):
+        """Record a job's published post at most once, however often its reply is retried"""
+        if job.get('saved'):
+            return
+        await db.save_facebook_post(post_data)
+        await checkpoint(saved=True)
     
-    async def wait(self):
-        """Wait if rate limit reached"""
-        now = datetime.utcnow().timestamp()
+    async def run_post_job(self, job, report, checkpoint):
+        """Publish a queued /fb-post and return the reply as (content, embed)"""
+        account = await db.get_facebook_account(job['server_id'])
+        if not account:
+            raise Exception("No Facebook Page connected")
+        message, link = job['message'], job.get('link')
         
-        # Remove old calls outside the time window
-        self.calls = [t for t in self.calls if t > now - self.window]
+        # Post to Facebook
+        post_id = await self.publish_once(job, checkpoint, lambda: self.create_post(
+            account['page_id'],
+            account['access_token'],
+            message,
+            link
+        ))
+        
+        # Save to database
+        await self.save_once(job, checkpoint, {
+            'server_id': job['server_id'],
+            'page_id': account['page_id'],
+            'fb_post_id': post_id,
+            'message': message,
+            'link': link,
+            'status': 'published',
+            'platform': 'facebook'
+        })
+        
+        # Success message
+        embed = discord.Embed(
+            title=" Posted to Facebook!",
+            description=message[:300] + ('...' if len(message) > 300 else ''),
+            color=config.COLOR_SUCCESS
+        )
+        embed.add_field(name="Page", value=account['page_name'], inline=True)
+        embed.add_field(name="Post ID", value=post_id.split('_')[-1][:10] + '...', inline=True)
+        if link:
+            embed.add_field(name="Link", value=link, inline=False)
+        embed.set_footer(text=f"Posted at {datetime.utcnow().strftime('%Y-%m-%d %H:%M UTC')}")
+        return None, embed
+    
+    async def run_photo_job(self, job, report, checkpoint):
+        """Publish a queued /fb-post-image and return the reply as (content, embed)"""
+        account = await db.get_facebook_account(job['server_id'])
+        if not account:
+            raise Exception("No Facebook Page connected")
+        image_url, caption = job['image_url'], job.get('caption')
         
-        # Check if limit reached
-        if len(self.calls) >= self.max_calls:
-            wait_time = self.calls[0] + self.window - now
-            if wait_time > 0:
-                print(f'  Facebook rate limit reached ({self.max_calls}/hour), waiting {wait_time:.0f}s')
-                await asyncio.sleep(wait_time)
-                self.calls = []
+        # Post image
+        post_id = await self.publish_once(job, checkpoint, lambda: self.post_photo(
+            account['page_id'],
+            account['access_token'],
+            image_url,
+            caption
+        ))
         
-        self.calls.append(now)
+        # Save to database
+        await self.save_once(job, checkpoint, {
+            'server_id': job['server_id'],
+            'page_id': account['page_id'],
+            'fb_post_id': post_id,
+            'message': caption,
+            'image_url': image_url,
+            'status': 'published',
+            'platform': 'facebook'
+        })
+        
+        embed = discord.Embed(
+            title=" Image Posted to Facebook!",
+            description=caption[:200] if caption else "No caption",
+            color=config.COLOR_SUCCESS
+        )
+        embed.set_thumbnail(url=image_url)
+        embed.add_field(name="Page", value=account['page_name'])
+        embed.add_field(name="Post ID", value=post_id.split('_')[-1][:10] + '...')
+        return None, embed
+    
+    async def crosspost(self, server_id, user_id, message, image_url=None):
+        """Publish one /publish post to the server's page and return a short result"""
+        account = await db.get_facebook_account(server_id)
+        if not account:
+            raise PlatformSkipped("No Facebook Page connected")
+        
+        if image_url:
+            post_id = await self.post_photo(account['page_id'], account['access_token'], image_url, message)
+        else:
+            post_id = await self.create_post(account['page_id'], account['access_token'], message)
+        
+        await db.save_facebook_post({
+            'server_id': server_id,
+            'page_id': account['page_id'],
+            'fb_post_id': post_id,
+            'message': message,
+            'image_url': image_url,
+            'status': 'published',
+            'platform': 'facebook'
+        })
+        return f"Post `{post_id}` on {account['page_name']}"
+    
+    async def publish_scheduled_post(self, post):
+        """Publish a scheduled Facebook post and return its ID; the scheduler records the status"""
+        account = await db.get_facebook_account(post['server_id'])
+        if not account:
+            raise Exception(f"No account found for server {post['server_id']}")
+        
+        # Post to Facebook
+        post_id = await self.create_post(
+            post['page_id'],
+            account['access_token'],
+            post['message'],
+            post.get('link')
+        )
+        print(f' Published scheduled Facebook post: {post_id}')
+        return post_id
 
 
 async def setup(bot):
@@ -2,11 +2,16 @@
 from discord import app_commands, ui
 from discord.ext import commands
 import discord
-import requests
 import sqlite3
 import os
 from urllib.parse import urlencode
 import asyncio
+from utils.instagram_api import instagram
+from utils.containers import containers
+from utils.publish_queue import publish_queue, PermanentFailure
+from utils.crosspost import PlatformSkipped
+from utils.cache import TTLCache
+import config
 
 DB_PATH = 'database.db'
 
@@ -61,17 +66,12 @@ def get_user_data(discord_id):
     return row
 
 
-def call_api(params, endpoint):
-    resp = requests.get(f"https://graph.instagram.com/{endpoint}", params=params)
-    return resp.json()
+async def call_api(params, endpoint):
+    return await instagram.get(endpoint, params)
 
 
-def call_api_post(params, endpoint):
-    resp = requests.post(f"https://graph.instagram.com/{endpoint}", data=params)
-    try:
-        return resp.json()
-    except ValueError:
-        return {"error": "invalid_json_response", "status_code": resp.status_code, "text": resp.text}
+async def call_api_post(params, endpoint):
+    return await instagram.post(endpoint, params)
 
 
 def format_dict(data, indent=0):
@@ -99,29 +99,201 @@ def shorten_url(url, max_len=40):
     return url[:max_len] + "..."
 
 
-class InstagramPostsView(ui.View):
-    def __init__(self, post_data, token):
-        super().__init__(timeout=None)
-        self.post_data = post_data
-        self.token = token
+def post_embed(post):
+    caption = post.get('caption', 'No caption')
+    media_type = post.get('media_type')
+    media_url = post.get('media_url', '')
+    url_short = shorten_url(media_url)
+    timestamp = post.get('timestamp', '')
+
+    embed = discord.Embed(title=f"Post {post['id']}", color=discord.Color.blue())
+    embed.add_field(name="Caption", value=caption, inline=False)
+    embed.add_field(name="Type", value=media_type, inline=True)
+    embed.add_field(name="URL", value=url_short, inline=False)
+    embed.add_field(name="Timestamp", value=timestamp, inline=True)
+    if media_url:
+        embed.set_image(url=media_url)
+    return embed
+
+
+MEDIA_FIELDS = "id,caption,media_type,media_url,permalink,timestamp"
+
+
+class MediaListing:
+    """A user's media, pulled from the me/media stream as they page through it"""
 
-    @ui.button(label="Delete Post", style=discord.ButtonStyle.danger)
-    async def delete_button(self, interaction: discord.Interaction, button: ui.Button):
+    def __init__(self, token):
+        self.token = token
+        params = {"fields": MEDIA_FIELDS, "limit": config.INSTAGRAM_PAGE_SIZE, "access_token": token}
+        self.stream = instagram.paginate("me/media", params)
+        self.media = []
+        self.exhausted = False
+        self.loading = asyncio.Lock()
+
+    async def load(self, index):
+        """Pull media from the stream until `index` is available; False if there is no such post"""
+        async with self.loading:
+            # Read one ahead so the Next button knows whether there is more
+            while len(self.media) <= index + 1 and not self.exhausted:
+                try:
+                    self.media.append(await self.stream.__anext__())
+                except StopAsyncIteration:
+                    self.exhausted = True
+        return index < len(self.media)
+
+    def remove(self, media_id):
+        self.media = [post for post in self.media if post['id'] != media_id]
+
+    def render(self, index):
+        """Return the (embed, view) showing the post at `index`"""
+        post = self.media[index]
+        embed = post_embed(post)
+        total = f"{len(self.media)}" if self.exhausted else f"{len(self.media)}+"
+        embed.set_footer(text=f"Post {index + 1} of {total}")
+
+        # Only dynamic items, so Discord's view store keeps nothing per message
+        view = ui.View(timeout=None)
+        view.add_item(DeletePostButton(post['id']))
+        view.add_item(PostDetailsButton(post['id']))
+        view.add_item(PostInsightsButton(post['id'], post.get('media_type', 'IMAGE')))
+        view.add_item(PostPageButton(max(index - 1, 0), "Previous", disabled=index == 0))
+        view.add_item(PostPageButton(
+            index + 1, "Next",
+            disabled=self.exhausted and index == len(self.media) - 1
+        ))
+        return embed, view
+
+
+# Open listings per Discord user; expired or evicted ones restart from the first page
+listings = TTLCache(config.INSTAGRAM_LISTING_CACHE_SIZE, config.INSTAGRAM_VIEW_TIMEOUT)
+
+
+def get_listing(user_id, token):
+    listing = listings.get(user_id)
+    if listing is None or listing.token != token:
+        listing = MediaListing(token)
+    listings.set(user_id, listing)
+    return listing
+
+
+async def resolve_token(interaction):
+    user = get_user_data(interaction.user.id)
+    if not user:
+        await interaction.followup.send("You are not registered. Use /insta_login_dev first.", ephemeral=True)
+        return None
+    return user["instagram_token"]
+
+
+async def show_post(interaction, index):
+    """Edit the listing message to show the post at `index` (or the last one left)"""
+    token = await resolve_token(interaction)
+    if not token:
+        return
+    listing = get_listing(interaction.user.id, token)
+    try:
+        if not await listing.load(index):
+            index = len(listing.media) - 1
+    except Exception as e:
+        await interaction.followup.send(str(e), ephemeral=True)
+        return
+    if index < 0:
+        await interaction.edit_original_response(content="No posts left.", embed=None, view=None)
+        return
+    embed, view = listing.render(index)
+    await interaction.edit_original_response(content=None, embed=embed, view=view)
+
+
+class PostPageButton(ui.DynamicItem[ui.Button], template=r'ig:page:(?P<index>\d+)'):
+    def __init__(self, index, label, disabled=False):
+        super().__init__(ui.Button(
+            label=label,
+            style=discord.ButtonStyle.secondary,
+            custom_id=f"ig:page:{index}",
+            disabled=disabled,
+            row=1
+        ))
+        self.index = index
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(int(match['index']), item.label)
+
+    async def callback(self, interaction: discord.Interaction):
+        await interaction.response.defer()
+        await show_post(interaction, self.index)
+
+
+class DeletePostButton(ui.DynamicItem[ui.Button], template=r'ig:delete:(?P<media_id>\d+)'):
+    def __init__(self, media_id):
+        super().__init__(ui.Button(
+            label="Delete Post",
+            style=discord.ButtonStyle.danger,
+            custom_id=f"ig:delete:{media_id}"
+        ))
+        self.media_id = media_id
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(match['media_id'])
+
+    async def callback(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True)
-        resp = requests.delete(f"https://graph.instagram.com/{self.post_data['id']}", params={"access_token": self.token})
-        result = resp.json() if resp.text else {"status": "success"}
+        token = await resolve_token(interaction)
+        if not token:
+            return
+        result = await instagram.delete(self.media_id, {"access_token": token}) or {"status": "success"}
         await interaction.followup.send(f"Post deleted:\n{format_dict(result)}", ephemeral=True)
-        self.stop()
 
-    @ui.button(label="View Details", style=discord.ButtonStyle.secondary)
-    async def details_button(self, interaction: discord.Interaction, button: ui.Button):
+        index = 0
+        listing = listings.get(interaction.user.id)
+        if listing is not None:
+            index = next((i for i, post in enumerate(listing.media) if post['id'] == self.media_id), 0)
+            listing.remove(self.media_id)
+        await show_post(interaction, index)
+
+
+class PostDetailsButton(ui.DynamicItem[ui.Button], template=r'ig:details:(?P<media_id>\d+)'):
+    def __init__(self, media_id):
+        super().__init__(ui.Button(
+            label="View Details",
+            style=discord.ButtonStyle.secondary,
+            custom_id=f"ig:details:{media_id}"
+        ))
+        self.media_id = media_id
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(match['media_id'])
+
+    async def callback(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True)
-        await interaction.followup.send(f"Post Details:\n{format_dict(self.post_data)}", ephemeral=True)
+        token = await resolve_token(interaction)
+        if not token:
+            return
+        post_data = await call_api({"fields": MEDIA_FIELDS, "access_token": token}, self.media_id)
+        await interaction.followup.send(f"Post Details:\n{format_dict(post_data)}", ephemeral=True)
+
+
+class PostInsightsButton(ui.DynamicItem[ui.Button], template=r'ig:insights:(?P<media_id>\d+):(?P<media_type>[A-Z_]+)'):
+    def __init__(self, media_id, media_type):
+        super().__init__(ui.Button(
+            label="View Insights",
+            style=discord.ButtonStyle.primary,
+            custom_id=f"ig:insights:{media_id}:{media_type}"
+        ))
+        self.media_id = media_id
+        self.media_type = media_type
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(match['media_id'], match['media_type'])
 
-    @ui.button(label="View Insights", style=discord.ButtonStyle.primary)
-    async def view_insights(self, interaction: discord.Interaction, button: ui.Button):
+    async def callback(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True)
-        post_type = self.post_data.get("media_type", "IMAGE").lower()
+        token = await resolve_token(interaction)
+        if not token:
+            return
+        post_type = self.media_type.lower()
 
         metrics_map = {
             "image": "reach,likes,comments,saved",
@@ -130,10 +302,10 @@ class InstagramPostsView(ui.View):
         }
 
         metrics = metrics_map.get(post_type, "reach,likes,comments")
-        params = {"metric": metrics, "access_token": self.token}
-        resp = call_api(params, f"{self.post_data['id']}/insights")
+        params = {"metric": metrics, "access_token": token}
+        resp = await call_api(params, f"{self.media_id}/insights")
 
-        embed = discord.Embed(title=f"Insights for Post {self.post_data['id']}", color=discord.Color.green())
+        embed = discord.Embed(title=f"Insights for Post {self.media_id}", color=discord.Color.green())
         if "data" in resp and isinstance(resp["data"], list):
             for metric in resp["data"]:
                 name = metric.get("name", "Unknown")
@@ -145,20 +317,109 @@ class InstagramPostsView(ui.View):
         await interaction.followup.send(embed=embed, ephemeral=True)
 
 
+POST_BUTTONS = (PostPageButton, DeletePostButton, PostDetailsButton, PostInsightsButton)
+
+
 class InstagramCog(commands.Cog):
+    platform = "Instagram"
+
     def __init__(self, bot):
         self.bot = bot
         init_db()
 
+    async def cog_load(self):
+        # Registered once; buttons on every listing ever sent resolve through these
+        self.bot.add_dynamic_items(*POST_BUTTONS)
+        publish_queue.register("instagram_media", self.run_media_job)
+        publish_queue.start(self.bot)
+
+    async def cog_unload(self):
+        self.bot.remove_dynamic_items(*POST_BUTTONS)
+        publish_queue.unregister("instagram_media")
+        containers.stop()
+        await instagram.close()
+
     async def get_token_or_error(self, interaction):
         user = get_user_data(interaction.user.id)
         if not user:
-            await interaction.response.send_message("You are not registered. Use /insta_login_dev first.", ephemeral=True)
+            if interaction.response.is_done():
+                await interaction.followup.send("You are not registered. Use /insta_login_dev first.", ephemeral=True)
+            else:
+                await interaction.response.send_message("You are not registered. Use /insta_login_dev first.", ephemeral=True)
             return None, None
         token = user["instagram_token"]
         ig_id = user["instagram_id"] or user["username"]
         return token, ig_id
 
+    async def create_container(self, user, label, params):
+        """Create a post or reel container and return its creation id"""
+        token = user["instagram_token"]
+        ig_id = user["instagram_id"] or user["username"]
+
+        create_resp = await call_api_post({**params, "access_token": token}, f"{ig_id}/media")
+        if "id" not in create_resp:
+            raise Exception(f"Failed to create {label.lower()}: {create_resp}")
+        return create_resp["id"]
+
+    async def publish_container(self, user, label, creation_id, report=None):
+        """Wait for Instagram to finish a container and publish it"""
+        token = user["instagram_token"]
+        ig_id = user["instagram_id"] or user["username"]
+
+        async def on_progress(status, elapsed):
+            if report:
+                await report(f"{label} container `{creation_id}`: {status} ({elapsed:.0f}s)")
+
+        return await containers.track(creation_id, ig_id, token, on_progress)
+
+    async def publish_media(self, user, label, params, report=None):
+        """Create a post or reel container, wait for Instagram to finish it and publish it"""
+        creation_id = await self.create_container(user, label, params)
+        return await self.publish_container(user, label, creation_id, report)
+
+    async def run_media_job(self, job, report, checkpoint):
+        """Publish a queued post or reel, resuming from the container or media a retry already has"""
+        user = get_user_data(job["user_id"])
+        if not user:
+            raise Exception("You are not registered. Use /insta_login_dev first.")
+
+        if not job.get("media_id"):
+            # Reuse the container from an earlier attempt instead of creating (and publishing) another
+            creation_id = job.get("creation_id")
+            if not creation_id:
+                creation_id = await self.create_container(user, job["label"], job["params"])
+                await checkpoint(creation_id=creation_id)
+
+            publish_resp = await self.publish_container(user, job["label"], creation_id, report)
+            if "id" not in publish_resp:
+                if publish_resp.get("error") in ("timeout", "no_response"):
+                    # The request went out, Instagram may have published it anyway
+                    raise PermanentFailure(f"No answer to media_publish, check your profile before posting again: {publish_resp}")
+                raise Exception(f"Publish failed: {publish_resp}")
+            await checkpoint(media_id=publish_resp["id"], publish_resp=publish_resp)
+
+        return f"{job['label']} published:\n```json\n{job['publish_resp']}\n```", None
+
+    async def crosspost(self, server_id, user_id, message, image_url=None):
+        """Publish one /publish post to the user's account and return a short result"""
+        user = get_user_data(user_id)
+        if not user:
+            raise PlatformSkipped("Not registered, use /insta_login_dev")
+        if not image_url:
+            raise PlatformSkipped("Instagram posts need an image")
+        publish_resp = await self.publish_media(user, "Post", {"image_url": image_url, "caption": message})
+        if "id" not in publish_resp:
+            raise Exception(f"Publish failed: {publish_resp}")
+        return f"Media `{publish_resp['id']}`"
+
+    async def enqueue_media(self, interaction, label, params):
+        message = await interaction.followup.send(f"{label} queued for publishing...", ephemeral=True, wait=True)
+        await publish_queue.enqueue(interaction, "instagram_media", {
+            "user_id": str(interaction.user.id),
+            "label": label,
+            "params": params
+        }, message)
+
     @app_commands.command(name="insta_login_dev", description="Manually register a token")
     @app_commands.describe(token="Your Instagram access token", username="Your Instagram username", instagram_id="Instagram numeric ID (optional)")
     async def insta_login_dev(self, interaction: discord.Interaction, token: str, username: str, instagram_id: str = None):
@@ -174,22 +435,7 @@ class InstagramCog(commands.Cog):
         if not token:
             return
 
-        params_create = {"image_url": image_url, "caption": caption, "access_token": token}
-        create_resp = call_api_post(params_create, f"{ig_id}/media")
-        if "id" not in create_resp:
-            await interaction.followup.send(f"Failed to create post: {create_resp}", ephemeral=True)
-            return
-        creation_id = create_resp["id"]
-
-
-        for _ in range(10):
-            status = call_api({"fields": "status_code", "access_token": token}, creation_id)
-            if status.get("status_code") == "FINISHED":
-                break
-            await asyncio.sleep(2)
-
-        publish_resp = call_api_post({"creation_id": creation_id, "access_token": token}, f"{ig_id}/media_publish")
-        await interaction.followup.send(f"Post published:\n```json\n{publish_resp}\n```", ephemeral=True)
+        await self.enqueue_media(interaction, "Post", {"image_url": image_url, "caption": caption})
 
     @app_commands.command(name="instagram_post_reel", description="Post a reel with caption")
     @app_commands.describe(caption="Text caption for the reel", video_url="URL of the video to post")
@@ -199,21 +445,7 @@ class InstagramCog(commands.Cog):
         if not token:
             return
 
-        params_create = {"media_type": "REELS", "video_url": video_url, "caption": caption, "access_token": token}
-        create_resp = call_api_post(params_create, f"{ig_id}/media")
-        if "id" not in create_resp:
-            await interaction.followup.send(f"Failed to create reel: {create_resp}", ephemeral=True)
-            return
-        creation_id = create_resp["id"]
-
-        for _ in range(10):
-            status = call_api({"fields": "status_code", "access_token": token}, creation_id)
-            if status.get("status_code") == "FINISHED":
-                break
-            await asyncio.sleep(2)
-
-        publish_resp = call_api_post({"creation_id": creation_id, "access_token": token}, f"{ig_id}/media_publish")
-        await interaction.followup.send(f"Reel published:\n```json\n{publish_resp}\n```", ephemeral=True)
+        await self.enqueue_media(interaction, "Reel", {"media_type": "REELS", "video_url": video_url, "caption": caption})
 
     @app_commands.command(name="instagram_posts", description="Get all your Instagram posts")
     async def get_all_posts(self, interaction: discord.Interaction):
@@ -222,29 +454,19 @@ class InstagramCog(commands.Cog):
         if not token:
             return
 
-        params = {"fields": "id,caption,media_type,media_url,permalink,timestamp", "access_token": token}
-        result = call_api(params, "me/media")
-        if "data" not in result or not result["data"]:
+        listing = MediaListing(token)
+        try:
+            found = await listing.load(0)
+        except Exception as e:
+            await interaction.followup.send(str(e), ephemeral=True)
+            return
+        if not found:
             await interaction.followup.send("No posts found.", ephemeral=True)
             return
 
-        for post in result["data"]:
-            caption = post.get('caption', 'No caption')
-            media_type = post.get('media_type')
-            media_url = post.get('media_url', '')
-            url_short = shorten_url(media_url)
-            timestamp = post.get('timestamp', '')
-
-            embed = discord.Embed(title=f"Post {post['id']}", color=discord.Color.blue())
-            embed.add_field(name="Caption", value=caption, inline=False)
-            embed.add_field(name="Type", value=media_type, inline=True)
-            embed.add_field(name="URL", value=url_short, inline=False)
-            embed.add_field(name="Timestamp", value=timestamp, inline=True)
-            if media_url:
-                embed.set_image(url=media_url)
-
-            view = InstagramPostsView(post, token)
-            await interaction.followup.send(embed=embed, view=view, ephemeral=True)
+        listings.set(interaction.user.id, listing)
+        embed, view = listing.render(0)
+        await interaction.followup.send(embed=embed, view=view, ephemeral=True)
 
     @app_commands.command(name="disconnect", description="Disconnect your Instagram account from the bot")
     async def disconnect(self, interaction: discord.Interaction):
@@ -1,8 +1,16 @@
 from discord.ext import commands
+from utils.crosspost import PlatformSkipped
 
 class LinkedInCog(commands.Cog):
+    platform = "LinkedIn"
+    crosspost_available = False  # Stub, crosspost() always skips
+
     def __init__(self, bot):
         self.bot = bot
 
+    async def crosspost(self, server_id, user_id, message, image_url=None):
+        # Stub until LinkedIn publishing is implemented
+        raise PlatformSkipped("LinkedIn publishing is not available yet")
+
 async def setup(bot):
     await bot.add_cog(LinkedInCog(bot))
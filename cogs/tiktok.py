@@ -1,9 +1,17 @@
 from discord.ext import commands
+from utils.crosspost import PlatformSkipped
 
 class TikTokCog(commands.Cog):
+    platform = "TikTok"
+    crosspost_available = False  # Stub, crosspost() always skips
+
     def __init__(self, bot):
         self.bot = bot
 
+    async def crosspost(self, server_id, user_id, message, image_url=None):
+        # Stub until TikTok publishing is implemented
+        raise PlatformSkipped("TikTok publishing is not available yet")
+
     @commands.command()
     async def tt_test(self, ctx):
         await ctx.send("TikTok cog fonctionne !")
@@ -16,23 +16,108 @@ DISCORD_TOKEN = os.getenv('DISCORD_TOKEN')
 FACEBOOK_APP_ID = os.getenv('FACEBOOK_APP_ID')
 FACEBOOK_APP_SECRET = os.getenv('FACEBOOK_APP_SECRET')
 FACEBOOK_MAX_CALLS = int(os.getenv('FACEBOOK_MAX_CALLS', 180))
+FACEBOOK_BURST = int(os.getenv('FACEBOOK_BURST', 50))  # Fits one full Graph batch
 FACEBOOK_API_VERSION = 'v21.0'
+FACEBOOK_STATS_MAX_POSTS = 25  # Posts per /fb-stats call (one embed field each)
+FACEBOOK_FEED_MAX_POSTS = 1000  # Posts /fb-recent streams through for its totals (10 Graph pages, well inside one burst)
+FACEBOOK_REPORT_MAX_DAYS = 365  # Longest period /fb-report covers
+FACEBOOK_TREND_MAX_DAYS = 31  # Days /fb-trend lists, one line each
 
 # OAuth Configuration
 REDIRECT_URI = os.getenv('REDIRECT_URI', 'http://localhost:8080/callback')
 OAUTH_PORT = 8080
 
 # Database Configuration
-
+DB_POOL_SIZE = 2  # Persistent SQLite connections (and executor threads)
+DB_MMAP_SIZE = 268435456  # 256 MB of memory-mapped I/O
+DB_CACHE_SIZE = -65536  # Page cache size in KiB when negative (64 MB)
+DB_BUSY_TIMEOUT_MS = 5000  # Wait for locks instead of failing immediately
+ACCOUNT_CACHE_SIZE = 1024  # Decrypted accounts kept in memory
+ACCOUNT_CACHE_TTL = 300  # Seconds before a cached account is reloaded
 
 # Security Configuration
 ENCRYPTION_KEY = os.getenv('ENCRYPTION_KEY')
 
 # Rate Limiting
 RATE_LIMIT_WINDOW = 3600  # 1 hour in seconds
+RATE_LIMIT_MAX_BUCKETS = 10000  # Per-page buckets kept before idle ones are pruned
+FACEBOOK_USAGE_PACE_THRESHOLD = 75  # Usage % where requests start being paced
+FACEBOOK_USAGE_MAX_PACE = 30  # Longest pacing delay (seconds) just below 100% usage
+FACEBOOK_THROTTLE_BACKOFF = 300  # Seconds to back off after a throttling error
+
+# Graph HTTP Client
+GRAPH_MAX_CONNECTIONS = 100  # Total pooled connections
+GRAPH_MAX_CONNECTIONS_PER_HOST = 20  # Per-host connection cap
+GRAPH_DNS_CACHE_TTL = 300  # Seconds to cache DNS lookups
+GRAPH_KEEPALIVE_TIMEOUT = 60  # Seconds to keep idle connections open
+GRAPH_REQUEST_TIMEOUT = 30  # Total seconds per request
+GRAPH_BATCH_MAX_SIZE = 50  # Graph allows up to 50 sub-requests per batch
+GRAPH_BATCH_WINDOW = 0.01  # Seconds to collect concurrent reads into one batch
+GRAPH_PAGE_SIZE = 100  # Items per request when following Graph paging cursors
+
+# Response Cache
+RESPONSE_CACHE_SIZE = 2048  # Cached Graph responses kept in memory
+RESPONSE_CACHE_TTLS = {  # Seconds each kind of response stays fresh
+    'page_info': 600,
+    'feed': 120,
+    'insights': 900
+}
+RESPONSE_CACHE_STALE_TTL = 86400  # Seconds a stale snapshot may still be shown while refreshing
+RESPONSE_CACHE_PERSIST = os.getenv('RESPONSE_CACHE_PERSIST', 'true').lower() == 'true'  # Keep warm data in SQLite
+
+# Insights Collector Configuration
+INSIGHTS_COLLECT_INTERVAL = 900  # Seconds between collector rounds
+INSIGHTS_MAX_PER_RUN = 500  # Snapshots taken per round, most overdue first
+INSIGHTS_RESERVED_CALLS = 10  # Rate limit tokens per page left for commands and scheduled posts
+INSIGHTS_SCHEDULE = [  # (post age below, seconds between snapshots); older posts are no longer tracked
+    (86400, 3600),  # first day: hourly
+    (7 * 86400, 6 * 3600),  # first week: every 6 hours
+    (30 * 86400, 86400),  # first month: daily
+    (90 * 86400, 7 * 86400)  # first quarter: weekly
+]
+
+# Retention Configuration
+ANALYTICS_RETENTION = [  # (snapshot age above, keep only each post's newest snapshot per hour/day/week)
+    (2 * 86400, 'hour'),  # after two days: hourly
+    (14 * 86400, 'day'),  # after two weeks: daily
+    (90 * 86400, 'week')  # after a quarter: weekly
+]
+POST_RETENTION_DAYS = int(os.getenv('POST_RETENTION_DAYS', 400))  # Published/failed posts older than this leave facebook_posts
+POST_RETENTION_MODE = os.getenv('POST_RETENTION_MODE', 'archive')  # 'archive' (move to facebook_posts_archive) or 'prune' (delete with their snapshots)
+PUBLISH_JOB_RETENTION_DAYS = 30  # Finished publish jobs kept this long
+RETENTION_INTERVAL = 6 * 3600  # Seconds between retention runs
+RETENTION_BATCH_SIZE = 500  # Rows per delete transaction
+RETENTION_BATCH_PAUSE = 0.05  # Seconds between batches so other writers get the lock
+RETENTION_VACUUM_PAGES = 1000  # Pages returned to the OS per incremental vacuum step
+
+# Export Configuration
+EXPORT_DIR = os.getenv('EXPORT_DIR', 'exports')  # Root of the server_id=/month= partitioned export files
+EXPORT_FORMAT = os.getenv('EXPORT_FORMAT', 'parquet')  # 'parquet' or 'arrow' (Arrow IPC)
+EXPORT_CHUNK_ROWS = 50000  # Rows fetched and written per chunk, bounds export memory
+
+# Publish Queue Configuration
+PUBLISH_WORKERS = int(os.getenv('PUBLISH_WORKERS', 4))  # Jobs published at the same time
+PUBLISH_JOB_LEASE = 300  # Seconds a job stays claimed between worker heartbeats
+PUBLISH_QUEUE_POLL = 30  # Seconds between queue checks when idle (picks up retries and dead workers' jobs)
+PUBLISH_MAX_ATTEMPTS = 3  # Tries before a job is marked failed
+PUBLISH_RETRY_DELAY = 30  # Seconds before the first retry, doubled for each one after
+
+# Instagram Configuration
+INSTAGRAM_GRAPH_URL = 'https://graph.instagram.com'
+INSTAGRAM_REQUEST_TIMEOUT = 20  # Total seconds per Instagram request
+INSTAGRAM_PAGE_SIZE = 25  # Media per request when listing posts
+INSTAGRAM_VIEW_TIMEOUT = 900  # Seconds a listing keeps its fetched media before starting over
+INSTAGRAM_LISTING_CACHE_SIZE = 256  # Users whose open listings are kept in memory
+INSTAGRAM_CONTAINER_POLL_INITIAL = 2  # Seconds before the first container status check
+INSTAGRAM_CONTAINER_POLL_MAX = 30  # Longest wait between status checks
+INSTAGRAM_CONTAINER_DEADLINE = int(os.getenv('INSTAGRAM_CONTAINER_DEADLINE', 600))  # Give up on a container after this many seconds
 
 # Scheduler Configuration
-SCHEDULER_CHECK_INTERVAL = 60  # Check every 60 seconds
+SCHEDULER_CHECK_INTERVAL = 600  # Safety sweep for expired leases and posts added by other processes
+SCHEDULER_MAX_WORKERS = 10  # Scheduled posts published at the same time
+SCHEDULER_MAX_PER_PAGE = 2  # Concurrent publishes allowed for one page
+SCHEDULER_CLAIM_BATCH = 100  # Posts leased per claim query
+SCHEDULER_LEASE_SECONDS = 900  # Lease length before a stuck post is reclaimed
 
 # Facebook API URLs
 FACEBOOK_OAUTH_URL = 'https://www.facebook.com/v21.0/dialog/oauth'
@@ -53,6 +138,9 @@ def validate_config():
     if not FACEBOOK_APP_ID or not FACEBOOK_APP_SECRET:
         raise ValueError("FACEBOOK_APP_ID and FACEBOOK_APP_SECRET must be set in .env")
     
+    if POST_RETENTION_MODE not in ('archive', 'prune'):
+        raise ValueError("POST_RETENTION_MODE must be 'archive' or 'prune'")
+    
     if not ENCRYPTION_KEY:
         from cryptography.fernet import Fernet
         key = Fernet.generate_key().decode()
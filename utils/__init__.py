@@ -2,12 +2,31 @@
 Utility modules for Facebook Discord Bot
 """
 
-from .database import Database, db
+from .cache import TTLCache
+from .singleflight import SingleFlight
+from .database import Database, AsyncDatabase, db
+from .graph import GraphClient, graph
+from .batch import GraphBatcher, batcher
+from .instagram_api import InstagramClient, instagram
+from .containers import ContainerTracker, containers
 from .oauth import FacebookOAuth, oauth
 from .scheduler import PostScheduler, scheduler
+from .publish_queue import PublishQueue, publish_queue
+from .insights import InsightsCollector, insights_collector
+from .retention import RetentionEngine, retention
+from .response_cache import ResponseCache, response_cache
 
 __all__ = [
-    'Database', 'db',
+    'TTLCache', 'SingleFlight',
+    'Database', 'AsyncDatabase', 'db',
+    'GraphClient', 'graph',
+    'GraphBatcher', 'batcher',
+    'InstagramClient', 'instagram',
+    'ContainerTracker', 'containers',
     'FacebookOAuth', 'oauth',
-    'PostScheduler', 'scheduler'
+    'PostScheduler', 'scheduler',
+    'PublishQueue', 'publish_queue',
+    'InsightsCollector', 'insights_collector',
+    'RetentionEngine', 'retention',
+    'ResponseCache', 'response_cache'
 ]
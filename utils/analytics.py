@@ -0,0 +1,125 @@
+"""
+Vectorized analytics rollups
+Loads facebook_analytics columns into NumPy arrays and computes reports in bulk
+"""
+
+import numpy as np
+
+SNAPSHOT_DTYPE = np.dtype([
+    ('post', np.int64),  # facebook_posts._id
+    ('published_at', np.float64),  # epoch seconds, NaN if unknown
+    ('fetched_at', np.float64),
+    ('impressions', np.int64),
+    ('engaged', np.int64),
+    ('clicks', np.int64),
+])
+
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+PERCENTILES = (50, 90, 99)
+
+# julianday() -> unix epoch seconds, so SQLite hands NumPy plain floats
+EPOCH = "(julianday({}) - 2440587.5) * 86400.0"
+
+
+def load_snapshots(conn, server_id, since):
+    """Read a server's snapshots since `since` straight into a structured array"""
+    cursor = conn.cursor()
+    cursor.row_factory = None  # plain tuples, which np.fromiter takes without a Python-level copy
+    cursor.execute(f'''
+        SELECT p._id, COALESCE({EPOCH.format('p.published_at')}, -1), {EPOCH.format('a.fetched_at')},
+               COALESCE(a.post_impressions, 0), COALESCE(a.post_engaged_users, 0), COALESCE(a.post_clicks, 0)
+        FROM facebook_analytics a
+        JOIN facebook_posts p ON p.fb_post_id = a.post_id
+        WHERE a.server_id = ? AND a.fetched_at >= ?
+    ''', (server_id, since))
+    snapshots = np.fromiter(cursor, dtype=SNAPSHOT_DTYPE)
+    snapshots['published_at'][snapshots['published_at'] < 0] = np.nan
+    return snapshots
+
+
+def compute_report(snapshots, top=5):
+    """Per-post rollups, percentiles, period deltas and weekday engagement in bulk"""
+    if len(snapshots) == 0:
+        return None
+
+    # Latest and earliest snapshot per post without sorting: post ids are small
+    # integer keys, so reduce fetched_at into per-id slots and pick the matching rows
+    post = snapshots['post']
+    fetched = snapshots['fetched_at']
+    slots = int(post.max()) + 1
+    newest = np.full(slots, -np.inf)
+    oldest = np.full(slots, np.inf)
+    np.maximum.at(newest, post, fetched)
+    np.minimum.at(oldest, post, fetched)
+
+    rows = np.arange(len(snapshots))
+    last = np.empty(slots, dtype=np.int64)
+    first = np.empty(slots, dtype=np.int64)
+    is_newest = fetched == newest[post]
+    is_oldest = fetched == oldest[post]
+    last[post[is_newest]] = rows[is_newest]
+    first[post[is_oldest]] = rows[is_oldest]
+    present = np.isfinite(newest)
+
+    latest = snapshots[last[present]]
+    earliest = snapshots[first[present]]
+    delta = {
+        metric: latest[metric] - earliest[metric]
+        for metric in ('impressions', 'engaged', 'clicks')
+    }
+
+    impressions = latest['impressions']
+    engaged = latest['engaged']
+    order = np.argsort(engaged, kind='stable')[::-1][:top]
+
+    # Weekday of publishing (1970-01-01 was a Thursday)
+    published = latest['published_at']
+    known = ~np.isnan(published)
+    weekday = ((published[known] // 86400 + 3) % 7).astype(np.int64)
+    weekday_impressions = np.bincount(weekday, weights=impressions[known], minlength=7)
+    weekday_engaged = np.bincount(weekday, weights=engaged[known], minlength=7)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weekday_rate = np.where(weekday_impressions > 0, weekday_engaged / weekday_impressions, np.nan)
+        engagement_rate = engaged / np.maximum(impressions, 1)
+
+    return {
+        'posts': len(latest),
+        'snapshots': len(snapshots),
+        'totals': {
+            'impressions': int(impressions.sum()),
+            'engaged': int(engaged.sum()),
+            'clicks': int(latest['clicks'].sum()),
+        },
+        'growth': {metric: int(values.sum()) for metric, values in delta.items()},
+        'impression_percentiles': dict(zip(PERCENTILES, np.percentile(impressions, PERCENTILES).tolist())),
+        'median_engagement_rate': float(np.median(engagement_rate)),
+        'top_posts': [
+            {
+                'post': int(latest['post'][i]),
+                'impressions': int(impressions[i]),
+                'engaged': int(engaged[i]),
+                'growth': int(delta['engaged'][i]),
+            }
+            for i in order
+        ],
+        'weekday_engagement': {
+            WEEKDAYS[day]: float(rate) for day, rate in enumerate(weekday_rate) if not np.isnan(rate)
+        },
+    }
+
+
+def build_report(conn, server_id, since, top=5):
+    """Load and roll up a server's analytics; runs on a database worker thread"""
+    report = compute_report(load_snapshots(conn, server_id, since), top)
+    if report and report['top_posts']:
+        ids = [entry['post'] for entry in report['top_posts']]
+        rows = conn.execute(
+            f"SELECT _id, fb_post_id, message FROM facebook_posts WHERE _id IN ({', '.join('?' * len(ids))})",
+            ids
+        ).fetchall()
+        posts = {row['_id']: row for row in rows}
+        for entry in report['top_posts']:
+            row = posts.get(entry['post'])
+            entry['fb_post_id'] = row['fb_post_id'] if row else None
+            entry['message'] = row['message'] if row else None
+    return report
@@ -0,0 +1,86 @@
+"""
+Graph API request batching
+Coalesces concurrent GETs into Facebook's batch endpoint
+"""
+
+import asyncio
+import json
+from urllib.parse import urlencode
+import config
+from utils.graph import GraphResponse, graph
+
+
+class GraphBatcher:
+    """Collects GETs for a short window and sends them as one batch request"""
+
+    def __init__(self, client, base_url):
+        self.client = client
+        self.base_url = base_url
+        self.max_size = config.GRAPH_BATCH_MAX_SIZE
+        self.window = config.GRAPH_BATCH_WINDOW
+        self.pending = {}  # access_token -> [(relative_url, Future)]
+        self.timers = {}  # access_token -> TimerHandle
+        self.sending = set()
+
+    async def get(self, url, params):
+        """Queue a GET and wait for its share of the batch response"""
+        params = dict(params or {})
+        access_token = params.pop('access_token')
+        path = url[len(self.base_url):].lstrip('/') if url.startswith(self.base_url) else url
+        relative_url = f"{path}?{urlencode(params)}" if params else path
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        queue = self.pending.setdefault(access_token, [])
+        queue.append((relative_url, future))
+
+        if len(queue) >= self.max_size:
+            self._flush(access_token)
+        elif access_token not in self.timers:
+            self.timers[access_token] = loop.call_later(self.window, self._flush, access_token)
+        return await future
+
+    def _flush(self, access_token):
+        timer = self.timers.pop(access_token, None)
+        if timer:
+            timer.cancel()
+        items = self.pending.pop(access_token, [])
+        if items:
+            task = asyncio.create_task(self._send(access_token, items))
+            self.sending.add(task)
+            task.add_done_callback(self.sending.discard)
+
+    async def _send(self, access_token, items):
+        try:
+            if len(items) == 1:
+                relative_url, future = items[0]
+                resp = await self.client.get(f"{self.base_url}/{relative_url}", params={'access_token': access_token})
+                if not future.done():
+                    future.set_result(resp)
+                return
+
+            batch = [{'method': 'GET', 'relative_url': relative_url} for relative_url, _ in items]
+            resp = await self.client.post(f"{self.base_url}/", data={
+                'access_token': access_token,
+                'batch': json.dumps(batch),
+                'include_headers': 'false'
+            })
+            results = resp.json() if resp.status == 200 else []
+            results = list(results) + [None] * (len(items) - len(results))
+
+            for (_, future), result in zip(items, results):
+                if future.done():
+                    continue
+                if result is None:
+                    # Whole batch failed, or Graph timed this sub-request out
+                    future.set_result(resp if resp.status != 200 else GraphResponse(504, resp.headers, ''))
+                else:
+                    future.set_result(GraphResponse(result.get('code', 500), resp.headers, result.get('body') or ''))
+        except Exception as e:
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+
+
+# Global batcher for Facebook Graph reads
+batcher = GraphBatcher(graph, config.FACEBOOK_GRAPH_URL)
@@ -0,0 +1,139 @@
+"""
+Instagram media container tracking
+Polls every pending container from one task with exponential backoff and publishes it once it finishes
+"""
+
+import asyncio
+import heapq
+import random
+import time
+import config
+from utils.instagram_api import instagram
+
+
+class TrackedContainer:
+    """One media container waiting for Instagram to finish processing it"""
+
+    def __init__(self, creation_id, ig_id, token, on_progress, future):
+        self.creation_id = creation_id
+        self.ig_id = ig_id
+        self.token = token
+        self.on_progress = on_progress
+        self.future = future
+        self.started_at = time.monotonic()
+        self.deadline = self.started_at + config.INSTAGRAM_CONTAINER_DEADLINE
+        self.interval = config.INSTAGRAM_CONTAINER_POLL_INITIAL / 2  # doubled before the first wait
+        self.status = None
+
+
+class ContainerTracker:
+    """Tracks many containers from a single polling task"""
+
+    def __init__(self, client):
+        self.client = client
+        self.timer_heap = []  # (next_poll_at, creation_id)
+        self.containers = {}  # creation_id -> TrackedContainer
+        self.wakeup = asyncio.Event()
+        self.task = None
+        self.polls = set()
+
+    def track(self, creation_id, ig_id, token, on_progress=None):
+        """Start tracking a container; returns a future for its media_publish response"""
+        future = asyncio.get_running_loop().create_future()
+        self.containers[creation_id] = TrackedContainer(creation_id, ig_id, token, on_progress, future)
+        heapq.heappush(self.timer_heap, (time.monotonic(), creation_id))
+        self.wakeup.set()
+
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+        return future
+
+    async def run(self):
+        """Poll containers as they come due until none are left"""
+        while self.containers:
+            self.wakeup.clear()
+            now = time.monotonic()
+
+            while self.timer_heap and self.timer_heap[0][0] <= now:
+                _, creation_id = heapq.heappop(self.timer_heap)
+                if creation_id in self.containers:
+                    # Poll in the background so one slow request doesn't hold up the others
+                    poll = asyncio.create_task(self.poll(self.containers[creation_id]))
+                    self.polls.add(poll)
+                    poll.add_done_callback(self.polls.discard)
+
+            timeout = self.timer_heap[0][0] - now if self.timer_heap else None
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def poll(self, container):
+        try:
+            result = await self.client.get(container.creation_id, {
+                "fields": "status_code,status",
+                "access_token": container.token
+            })
+            status = result.get("status_code")
+
+            if status == "FINISHED":
+                await self.progress(container, status)
+                self.finish(container, await self.client.post(f"{container.ig_id}/media_publish", {
+                    "creation_id": container.creation_id,
+                    "access_token": container.token
+                }))
+                return
+            if status == "PUBLISHED":
+                self.fail(container, f"Container {container.creation_id} was already published")
+                return
+            if status in ("ERROR", "EXPIRED"):
+                self.fail(container, f"Container {container.creation_id} {status.lower()}: {result.get('status', '')}")
+                return
+            if time.monotonic() >= container.deadline:
+                self.fail(container, f"Container {container.creation_id} not finished after "
+                                     f"{config.INSTAGRAM_CONTAINER_DEADLINE}s (last status: {status or result})")
+                return
+
+            await self.progress(container, status or "UNKNOWN")
+        except Exception as e:
+            self.fail(container, str(e))
+            return
+
+        # Back off exponentially with jitter so many containers don't poll in lockstep
+        container.interval = min(container.interval * 2, config.INSTAGRAM_CONTAINER_POLL_MAX)
+        delay = random.uniform(container.interval / 2, container.interval)
+        next_poll = min(time.monotonic() + delay, container.deadline)
+        is_next = not self.timer_heap or next_poll < self.timer_heap[0][0]
+        heapq.heappush(self.timer_heap, (next_poll, container.creation_id))
+        if is_next:
+            self.wakeup.set()
+
+    async def progress(self, container, status):
+        container.status = status
+        if not container.on_progress:
+            return
+        try:
+            await container.on_progress(status, time.monotonic() - container.started_at)
+        except Exception as e:
+            print(f'Error reporting progress for container {container.creation_id}: {e}')
+
+    def finish(self, container, result):
+        self.containers.pop(container.creation_id, None)
+        if not container.future.done():
+            container.future.set_result(result)
+
+    def fail(self, container, message):
+        self.containers.pop(container.creation_id, None)
+        if not container.future.done():
+            container.future.set_exception(Exception(message))
+
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+        for poll in self.polls:
+            poll.cancel()
+
+
+# Global container tracker
+containers = ContainerTracker(instagram)
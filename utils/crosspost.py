@@ -0,0 +1,26 @@
+"""
+Cross-platform publishing
+Runs one post on every platform cog at once and times each of them
+"""
+
+import asyncio
+import time
+
+
+class PlatformSkipped(Exception):
+    """Raised by a platform that isn't connected or can't take this kind of post"""
+
+
+async def fan_out(publishers, *args):
+    """Run every publisher concurrently; returns [(platform, status, detail, seconds)]"""
+    async def run(platform, publish):
+        started = time.perf_counter()
+        try:
+            status, detail = 'published', await publish(*args)
+        except PlatformSkipped as e:
+            status, detail = 'skipped', str(e)
+        except Exception as e:
+            status, detail = 'failed', str(e)
+        return platform, status, detail, time.perf_counter() - started
+
+    return await asyncio.gather(*(run(platform, publish) for platform, publish in publishers.items()))
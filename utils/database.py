@@ -5,13 +5,341 @@ Handles all database operations (SQLite)
 
 import sqlite3
 import json
-from datetime import datetime
+import asyncio
+import functools
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 from cryptography.fernet import Fernet
 import config
 import os
+from utils.cache import TTLCache, MISSING
 
 DB_PATH = 'database.db'
 
+
+# Per-connection settings; journal_mode is persistent and set by apply_migrations
+CONNECTION_PRAGMAS = [
+    'PRAGMA synchronous = NORMAL',
+    f'PRAGMA mmap_size = {config.DB_MMAP_SIZE}',
+    f'PRAGMA cache_size = {config.DB_CACHE_SIZE}',
+    f'PRAGMA busy_timeout = {config.DB_BUSY_TIMEOUT_MS}',
+]
+
+# Page id of a Graph post id ("{page_id}_{post_id}"), '' when it has none
+PAGE_OF_POST = "substr({0}, 1, instr({0}, '_') - 1)"
+
+# Snapshot metrics summed into the daily aggregates, as SQL over facebook_analytics
+DAILY_METRICS = {
+    'impressions': 'COALESCE(post_impressions, 0)',
+    'engaged': 'COALESCE(post_engaged_users, 0)',
+    'clicks': 'COALESCE(post_clicks, 0)',
+    'reactions': "COALESCE((SELECT SUM(value) FROM json_each(raw_data, '$.post_reactions_by_type_total')), 0)",
+}
+
+
+def daily_growth_sql(where=''):
+    """Growth and snapshot count per (server_id, page_id, day) from the snapshots matching `where`;
+    each snapshot contributes its growth over the post's previous snapshot to the day it was taken"""
+    return f'''SELECT server_id, page_id, day,
+              {', '.join(f'SUM({name} - previous_{name}) AS {name}' for name in DAILY_METRICS)}, COUNT(*) AS snapshots
+       FROM (
+           SELECT server_id, {PAGE_OF_POST.format('post_id')} AS page_id, date(fetched_at) AS day,
+                  {', '.join(f'{name}, LAG({name}, 1, 0) OVER post AS previous_{name}' for name in DAILY_METRICS)}
+           FROM (
+               SELECT id, post_id, server_id, fetched_at,
+                      {', '.join(f'{sql} AS {name}' for name, sql in DAILY_METRICS.items())}
+               FROM facebook_analytics {where}
+           )
+           WINDOW post AS (PARTITION BY post_id ORDER BY fetched_at, id)
+       )
+       GROUP BY server_id, page_id, day'''
+
+
+# Rebuild facebook_analytics_latest/_daily from the raw snapshots
+DAILY_ANALYTICS_REBUILD = [
+    'DELETE FROM facebook_analytics_latest',
+    'DELETE FROM facebook_analytics_daily',
+    f'''INSERT INTO facebook_analytics_latest
+       (post_id, server_id, page_id, impressions, engaged, clicks, reactions, fetched_at)
+       SELECT post_id, server_id, page_id, impressions, engaged, clicks, reactions, fetched_at FROM (
+           SELECT post_id, server_id, {PAGE_OF_POST.format('post_id')} AS page_id, fetched_at,
+                  {', '.join(f'{sql} AS {name}' for name, sql in DAILY_METRICS.items())},
+                  ROW_NUMBER() OVER (PARTITION BY post_id ORDER BY fetched_at DESC, id DESC) AS newest
+           FROM facebook_analytics
+       ) WHERE newest = 1''',
+    f'''INSERT INTO facebook_analytics_daily
+       (server_id, page_id, day, impressions, engaged, clicks, reactions, snapshots)
+       {daily_growth_sql()}''',
+]
+
+# Schema migrations, applied in order and tracked with PRAGMA user_version
+MIGRATIONS = [
+    # 1: indexes for the scheduler, per-server post lookups and analytics history
+    [
+        '''CREATE INDEX IF NOT EXISTS idx_facebook_posts_due
+           ON facebook_posts (status, scheduled_at)''',
+        '''CREATE INDEX IF NOT EXISTS idx_facebook_posts_server
+           ON facebook_posts (server_id, created_at)''',
+        '''CREATE INDEX IF NOT EXISTS idx_facebook_analytics_post
+           ON facebook_analytics (post_id, fetched_at, post_impressions, post_engaged_users, post_clicks)''',
+    ],
+    # 2: lease column so scheduled posts are claimed exactly once
+    [
+        'ALTER TABLE facebook_posts ADD COLUMN lease_until TIMESTAMP',
+        '''CREATE INDEX IF NOT EXISTS idx_facebook_posts_lease
+           ON facebook_posts (status, lease_until)''',
+    ],
+    # 3: persistent Graph response cache
+    [
+        '''CREATE TABLE IF NOT EXISTS graph_cache (
+            cache_key TEXT PRIMARY KEY,
+            kind TEXT,
+            page_id TEXT,
+            payload TEXT,
+            fetched_at REAL
+        )''',
+        '''CREATE INDEX IF NOT EXISTS idx_graph_cache_page
+           ON graph_cache (kind, page_id)''',
+    ],
+    # 4: durable outbound publish queue
+    [
+        '''CREATE TABLE IF NOT EXISTS publish_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            result TEXT,
+            error TEXT,
+            user_id TEXT,
+            channel_id TEXT,
+            message_id TEXT,
+            ephemeral INTEGER NOT NULL DEFAULT 0,
+            run_after TIMESTAMP,
+            lease_until TIMESTAMP,
+            created_at TIMESTAMP,
+            finished_at TIMESTAMP
+        )''',
+        '''CREATE INDEX IF NOT EXISTS idx_publish_jobs_ready
+           ON publish_jobs (status, run_after)''',
+        '''CREATE INDEX IF NOT EXISTS idx_publish_jobs_lease
+           ON publish_jobs (status, lease_until)''',
+    ],
+    # 5: published_at for every published post, so the insights collector can age them
+    [
+        '''UPDATE facebook_posts SET published_at = created_at
+           WHERE status = 'published' AND published_at IS NULL''',
+        '''CREATE INDEX IF NOT EXISTS idx_facebook_posts_published
+           ON facebook_posts (status, published_at)''',
+    ],
+    # 6: per-server analytics scans for reports, joined back to their posts
+    [
+        '''CREATE INDEX IF NOT EXISTS idx_facebook_analytics_server
+           ON facebook_analytics (server_id, fetched_at)''',
+        '''CREATE INDEX IF NOT EXISTS idx_facebook_posts_fb_id
+           ON facebook_posts (fb_post_id)''',
+    ],
+    # 7: materialized per-post latest values and per-page daily growth, backfilled from history
+    [
+        '''CREATE TABLE IF NOT EXISTS facebook_analytics_latest (
+            post_id TEXT PRIMARY KEY,
+            server_id TEXT,
+            page_id TEXT,
+            impressions INTEGER,
+            engaged INTEGER,
+            clicks INTEGER,
+            reactions INTEGER,
+            fetched_at TIMESTAMP
+        )''',
+        '''CREATE TABLE IF NOT EXISTS facebook_analytics_daily (
+            server_id TEXT,
+            page_id TEXT,
+            day TEXT,
+            impressions INTEGER,
+            engaged INTEGER,
+            clicks INTEGER,
+            reactions INTEGER,
+            snapshots INTEGER,
+            PRIMARY KEY (server_id, page_id, day)
+        ) WITHOUT ROWID''',
+        *DAILY_ANALYTICS_REBUILD,
+    ],
+    # 8: retention - age scans over snapshots and an archive for old posts
+    [
+        '''CREATE INDEX IF NOT EXISTS idx_facebook_analytics_fetched
+           ON facebook_analytics (fetched_at)''',
+        '''CREATE TABLE IF NOT EXISTS facebook_posts_archive (
+            _id INTEGER PRIMARY KEY,
+            server_id TEXT,
+            page_id TEXT,
+            fb_post_id TEXT,
+            message TEXT,
+            link TEXT,
+            image_url TEXT,
+            status TEXT,
+            platform TEXT,
+            scheduled_at TIMESTAMP,
+            published_at TIMESTAMP,
+            created_at TIMESTAMP,
+            lease_until TIMESTAMP,
+            archived_at TIMESTAMP
+        )''',
+        '''CREATE INDEX IF NOT EXISTS idx_publish_jobs_finished
+           ON publish_jobs (status, finished_at)''',
+    ],
+    # 9: last exported row per table and export directory, for incremental columnar exports
+    [
+        '''CREATE TABLE IF NOT EXISTS export_watermarks (
+            table_name TEXT,
+            destination TEXT,
+            last_id INTEGER,
+            exported_at TIMESTAMP,
+            PRIMARY KEY (table_name, destination)
+        )''',
+    ],
+    # 10: age scans over the persisted Graph response cache, so expired entries can be pruned
+    [
+        '''CREATE INDEX IF NOT EXISTS idx_graph_cache_fetched
+           ON graph_cache (fetched_at)''',
+    ],
+]
+
+# Post statuses that never change again, eligible for retention
+TERMINAL_POST_STATUSES = ('published', 'failed')
+
+# Insights stored in their own columns; any other metric goes to raw_data
+ANALYTICS_COLUMNS = ('post_impressions', 'post_engaged_users', 'post_clicks')
+
+
+def analytics_row(analytics_data, fetched_at):
+    """Row values for facebook_analytics, with extra metrics as compact JSON"""
+    extra = {
+        key: value for key, value in analytics_data.items()
+        if key not in ANALYTICS_COLUMNS and key not in ('post_id', 'server_id')
+    }
+    return (
+        analytics_data.get('post_id'),
+        analytics_data.get('server_id'),
+        *(analytics_data.get(column) for column in ANALYTICS_COLUMNS),
+        fetched_at,
+        json.dumps(extra, separators=(',', ':')) if extra else None
+    )
+
+
+def daily_metrics(analytics_data):
+    """The DAILY_METRICS values of one snapshot, computed in Python"""
+    reactions = analytics_data.get('post_reactions_by_type_total') or 0
+    return (
+        analytics_data.get('post_impressions') or 0,
+        analytics_data.get('post_engaged_users') or 0,
+        analytics_data.get('post_clicks') or 0,
+        sum(reactions.values()) if isinstance(reactions, dict) else reactions,
+    )
+
+
+def create_schema(conn):
+    """Create the base tables if they do not exist"""
+    cur = conn.cursor()
+    
+    # Only takes effect on a new database; existing ones are converted by the retention engine
+    cur.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    
+    # Facebook Accounts
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS facebook_accounts (
+        server_id TEXT PRIMARY KEY,
+        page_id TEXT,
+        page_name TEXT,
+        access_token TEXT,
+        connected_at TIMESTAMP
+    )''')
+    
+    # Facebook Posts
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS facebook_posts (
+        _id INTEGER PRIMARY KEY AUTOINCREMENT,
+        server_id TEXT,
+        page_id TEXT,
+        fb_post_id TEXT,
+        message TEXT,
+        link TEXT,
+        image_url TEXT,
+        status TEXT,
+        platform TEXT,
+        scheduled_at TIMESTAMP,
+        published_at TIMESTAMP,
+        created_at TIMESTAMP
+    )''')
+    
+    # Facebook Analytics
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS facebook_analytics (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        post_id TEXT,
+        server_id TEXT,
+        post_impressions INTEGER,
+        post_engaged_users INTEGER,
+        post_clicks INTEGER,
+        fetched_at TIMESTAMP,
+        raw_data TEXT
+    )''')
+    
+    conn.commit()
+
+
+def apply_migrations(conn):
+    """Enable WAL and bring the schema up to the latest migration"""
+    conn.execute('PRAGMA journal_mode = WAL')
+    while True:
+        with conn:
+            # Take the write lock before reading the version, so two processes starting
+            # together can't both apply the same migration
+            conn.execute('BEGIN IMMEDIATE')
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            if version >= len(MIGRATIONS):
+                return
+            number = version + 1
+            for statement in MIGRATIONS[version]:
+                conn.execute(statement)
+            conn.execute(f'PRAGMA user_version = {number}')
+        print(f'Applied database migration {number}')
+
+
+class ConnectionPool:
+    """Small pool of persistent SQLite connections shared across threads"""
+    
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+        self._conns = queue.Queue()
+        for _ in range(size):
+            self._conns.put(self._connect())
+    
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+    
+    @contextmanager
+    def connection(self):
+        """Borrow a connection, rolling back anything left uncommitted"""
+        conn = self._conns.get()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._conns.put(conn)
+    
+    def close(self):
+        while not self._conns.empty():
+            self._conns.get_nowait().close()
+
+
 class Database:
     """Database handler for Facebook (SQLite Adapter)"""
     
@@ -19,6 +347,7 @@ class Database:
         """Initialize SQLite tables"""
         try:
             self.cipher = Fernet(config.ENCRYPTION_KEY.encode())
+            self.pool = ConnectionPool(DB_PATH, config.DB_POOL_SIZE)
             self._init_tables()
             print('Database connected (SQLite)')
         except Exception as e:
@@ -26,56 +355,12 @@ class Database:
             raise
             
     def _get_conn(self):
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        return conn
+        return self.pool.connection()
 
     def _init_tables(self):
-        conn = self._get_conn()
-        cur = conn.cursor()
-        
-        # Facebook Accounts
-        cur.execute('''
-        CREATE TABLE IF NOT EXISTS facebook_accounts (
-            server_id TEXT PRIMARY KEY,
-            page_id TEXT,
-            page_name TEXT,
-            access_token TEXT,
-            connected_at TIMESTAMP
-        )''')
-        
-        # Facebook Posts
-        cur.execute('''
-        CREATE TABLE IF NOT EXISTS facebook_posts (
-            _id INTEGER PRIMARY KEY AUTOINCREMENT,
-            server_id TEXT,
-            page_id TEXT,
-            fb_post_id TEXT,
-            message TEXT,
-            link TEXT,
-            image_url TEXT,
-            status TEXT,
-            platform TEXT,
-            scheduled_at TIMESTAMP,
-            published_at TIMESTAMP,
-            created_at TIMESTAMP
-        )''')
-        
-        # Facebook Analytics
-        cur.execute('''
-        CREATE TABLE IF NOT EXISTS facebook_analytics (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            post_id TEXT,
-            server_id TEXT,
-            post_impressions INTEGER,
-            post_engaged_users INTEGER,
-            post_clicks INTEGER,
-            fetched_at TIMESTAMP,
-            raw_data TEXT
-        )''')
-        
-        conn.commit()
-        conn.close()
+        with self._get_conn() as conn:
+            create_schema(conn)
+            apply_migrations(conn)
     
     def encrypt(self, text):
         return self.cipher.encrypt(text.encode()).decode()
@@ -85,8 +370,7 @@ class Database:
     
     # Facebook Account Methods
     def save_facebook_account(self, server_id, account_data):
-        conn = self._get_conn()
-        try:
+        with self._get_conn() as conn:
             encrypted_token = self.encrypt(account_data['access_token'])
             conn.execute('''
                 INSERT OR REPLACE INTO facebook_accounts 
@@ -101,12 +385,9 @@ class Database:
             ))
             conn.commit()
             print(f'Saved Facebook account for server {server_id}')
-        finally:
-            conn.close()
     
     def get_facebook_account(self, server_id):
-        conn = self._get_conn()
-        try:
+        with self._get_conn() as conn:
             row = conn.execute('SELECT * FROM facebook_accounts WHERE server_id = ?', (str(server_id),)).fetchone()
             if row:
                 data = dict(row)
@@ -114,27 +395,21 @@ class Database:
                     data['access_token'] = self.decrypt(data['access_token'])
                 return data
             return None
-        finally:
-            conn.close()
     
     def delete_facebook_account(self, server_id):
-        conn = self._get_conn()
-        try:
+        with self._get_conn() as conn:
             cur = conn.execute('DELETE FROM facebook_accounts WHERE server_id = ?', (str(server_id),))
             conn.commit()
             print(f'Deleted Facebook account for server {server_id}')
             return cur.rowcount > 0
-        finally:
-            conn.close()
     
     # Post Methods
     def save_facebook_post(self, post_data):
-        conn = self._get_conn()
-        try:
+        with self._get_conn() as conn:
             cur = conn.execute('''
                 INSERT INTO facebook_posts 
-                (server_id, page_id, fb_post_id, message, link, image_url, status, platform, scheduled_at, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                (server_id, page_id, fb_post_id, message, link, image_url, status, platform, scheduled_at, published_at, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
                 post_data.get('server_id'),
                 post_data.get('page_id'),
@@ -145,62 +420,544 @@ class Database:
                 post_data.get('status'),
                 post_data.get('platform'),
                 post_data.get('scheduled_at'),
+                datetime.utcnow() if post_data.get('status') == 'published' else None,
                 datetime.utcnow()
             ))
             conn.commit()
             print(f'Saved post with ID {cur.lastrowid}')
             return cur.lastrowid
-        finally:
-            conn.close()
             
     def get_facebook_scheduled_posts(self):
-        conn = self._get_conn()
-        try:
+        with self._get_conn() as conn:
             rows = conn.execute('''
                 SELECT * FROM facebook_posts 
                 WHERE status = 'scheduled' AND scheduled_at <= ?
             ''', (datetime.utcnow(),)).fetchall()
             return [dict(row) for row in rows]
-        finally:
-            conn.close()
             
-    def update_facebook_post_status(self, post_id, status, fb_post_id=None):
-        conn = self._get_conn()
-        try:
+    def get_facebook_upcoming_posts(self):
+        """Return the id and time of every post still waiting to be published"""
+        with self._get_conn() as conn:
+            rows = conn.execute('''
+                SELECT _id, scheduled_at FROM facebook_posts
+                WHERE status = 'scheduled'
+            ''').fetchall()
+            return [dict(row) for row in rows]
+            
+    def claim_facebook_scheduled_posts(self, limit, lease_seconds):
+        """Atomically lease due posts (and posts whose lease expired) to this worker"""
+        now = datetime.utcnow()
+        with self._get_conn() as conn:
+            rows = conn.execute('''
+                UPDATE facebook_posts SET status = 'publishing', lease_until = ?
+                WHERE _id IN (
+                    SELECT _id FROM facebook_posts
+                    WHERE status = 'scheduled' AND scheduled_at <= ?
+                    UNION ALL
+                    SELECT _id FROM facebook_posts
+                    WHERE status = 'publishing' AND lease_until <= ?
+                    LIMIT ?
+                )
+                RETURNING *
+            ''', (now + timedelta(seconds=lease_seconds), now, now, limit)).fetchall()
+            conn.commit()
+            return [dict(row) for row in rows]
+            
+    def extend_facebook_post_lease(self, post_id, lease_until, lease_seconds):
+        """Push back a lease we still hold; returns the new lease_until, or None if it was lost"""
+        new_lease = datetime.utcnow() + timedelta(seconds=lease_seconds)
+        with self._get_conn() as conn:
+            cur = conn.execute('''
+                UPDATE facebook_posts SET lease_until = ?
+                WHERE _id = ? AND status = 'publishing' AND lease_until = ?
+            ''', (new_lease, post_id, lease_until))
+            conn.commit()
+            return new_lease if cur.rowcount else None
+
+    def update_facebook_post_status(self, post_id, status, fb_post_id=None, lease_until=None):
+        """Set a post's final status; with `lease_until`, only while that lease is still held"""
+        condition, lease = '', ()
+        if lease_until is not None:
+            condition, lease = " AND status = 'publishing' AND lease_until = ?", (lease_until,)
+        with self._get_conn() as conn:
             if fb_post_id:
-                conn.execute('UPDATE facebook_posts SET status = ?, published_at = ?, fb_post_id = ? WHERE _id = ?',
-                           (status, datetime.utcnow(), fb_post_id, post_id))
+                cur = conn.execute('UPDATE facebook_posts SET status = ?, published_at = ?, fb_post_id = ?, lease_until = NULL WHERE _id = ?' + condition,
+                                   (status, datetime.utcnow(), fb_post_id, post_id, *lease))
             else:
-                conn.execute('UPDATE facebook_posts SET status = ?, published_at = ? WHERE _id = ?',
-                           (status, datetime.utcnow(), post_id))
+                cur = conn.execute('UPDATE facebook_posts SET status = ?, published_at = ?, lease_until = NULL WHERE _id = ?' + condition,
+                                   (status, datetime.utcnow(), post_id, *lease))
             conn.commit()
+            if not cur.rowcount:
+                print(f'Post {post_id} lease was lost, status {status} not recorded')
+                return False
             print(f'Updated post {post_id} status to {status}')
-        finally:
-            conn.close()
+            return True
 
     def save_facebook_analytics(self, analytics_data):
-        conn = self._get_conn()
-        try:
-            # simple json dump for raw extra fields if needed, but we mapped the main ones
+        now = datetime.utcnow()
+        with self._get_conn() as conn:
             cur = conn.execute('''
                 INSERT INTO facebook_analytics 
-                (post_id, server_id, post_impressions, post_engaged_users, post_clicks, fetched_at)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                analytics_data.get('post_id'),
-                analytics_data.get('server_id'),
-                analytics_data.get('post_impressions'),
-                analytics_data.get('post_engaged_users'),
-                analytics_data.get('post_clicks'),
-                datetime.utcnow()
-            ))
+                (post_id, server_id, post_impressions, post_engaged_users, post_clicks, fetched_at, raw_data)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', analytics_row(analytics_data, now))
+            self._update_daily_analytics(conn, [analytics_data], now)
+            conn.commit()
+            return cur.lastrowid
+    
+    def save_facebook_analytics_many(self, snapshots):
+        """Insert a batch of analytics snapshots in one transaction"""
+        now = datetime.utcnow()
+        with self._get_conn() as conn:
+            conn.executemany('''
+                INSERT INTO facebook_analytics 
+                (post_id, server_id, post_impressions, post_engaged_users, post_clicks, fetched_at, raw_data)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', [analytics_row(snapshot, now) for snapshot in snapshots])
+            self._update_daily_analytics(conn, snapshots, now)
+            conn.commit()
+    
+    def _update_daily_analytics(self, conn, snapshots, fetched_at):
+        """Fold new snapshots into the daily aggregates as growth over each post's previous snapshot"""
+        day = fetched_at.date().isoformat()
+        previous = {}
+        latest, daily = {}, {}
+        for snapshot in snapshots:
+            post_id, server_id = snapshot.get('post_id'), snapshot.get('server_id')
+            page_id = post_id.split('_')[0] if '_' in post_id else ''
+            if post_id not in previous:
+                row = conn.execute(
+                    'SELECT impressions, engaged, clicks, reactions FROM facebook_analytics_latest WHERE post_id = ?',
+                    (post_id,)
+                ).fetchone()
+                previous[post_id] = tuple(row) if row else (0, 0, 0, 0)
+            values = daily_metrics(snapshot)
+            
+            totals = daily.setdefault((server_id, page_id, day), [0, 0, 0, 0, 0])
+            for i, (value, before) in enumerate(zip(values, previous[post_id])):
+                totals[i] += value - before
+            totals[4] += 1
+            previous[post_id] = values
+            latest[post_id] = (post_id, server_id, page_id, *values, fetched_at)
+        
+        conn.executemany('''
+            INSERT OR REPLACE INTO facebook_analytics_latest
+            (post_id, server_id, page_id, impressions, engaged, clicks, reactions, fetched_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', latest.values())
+        conn.executemany('''
+            INSERT INTO facebook_analytics_daily
+            (server_id, page_id, day, impressions, engaged, clicks, reactions, snapshots)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (server_id, page_id, day) DO UPDATE SET
+                impressions = impressions + excluded.impressions,
+                engaged = engaged + excluded.engaged,
+                clicks = clicks + excluded.clicks,
+                reactions = reactions + excluded.reactions,
+                snapshots = snapshots + excluded.snapshots
+        ''', [(*key, *totals) for key, totals in daily.items()])
+    
+    def rebuild_facebook_daily_analytics(self):
+        """Backfill the daily aggregates from every stored snapshot"""
+        with self._get_conn() as conn:
+            with conn:
+                for statement in DAILY_ANALYTICS_REBUILD:
+                    conn.execute(statement)
+            days = conn.execute('SELECT COUNT(*) FROM facebook_analytics_daily').fetchone()[0]
+            print(f'Rebuilt {days} days of Facebook analytics aggregates')
+            return days
+    
+    def get_facebook_daily_analytics(self, server_id, since_day):
+        """Per-day growth for a server since `since_day` (YYYY-MM-DD), summed across its pages"""
+        with self._get_conn() as conn:
+            rows = conn.execute('''
+                SELECT day, SUM(impressions) AS impressions, SUM(engaged) AS engaged,
+                       SUM(clicks) AS clicks, SUM(reactions) AS reactions, SUM(snapshots) AS snapshots
+                FROM facebook_analytics_daily
+                WHERE server_id = ? AND day >= ?
+                GROUP BY day
+                ORDER BY day
+            ''', (server_id, since_day)).fetchall()
+            return [dict(row) for row in rows]
+    
+    def get_facebook_analytics_totals(self, server_id):
+        """Current lifetime totals across a server's tracked posts"""
+        with self._get_conn() as conn:
+            row = conn.execute('''
+                SELECT COUNT(*) AS posts, COALESCE(SUM(impressions), 0) AS impressions,
+                       COALESCE(SUM(engaged), 0) AS engaged, COALESCE(SUM(clicks), 0) AS clicks,
+                       COALESCE(SUM(reactions), 0) AS reactions
+                FROM facebook_analytics_latest
+                WHERE server_id = ?
+            ''', (server_id,)).fetchone()
+            return dict(row)
+    
+    def get_facebook_posts_for_insights(self, published_since):
+        """Published posts newer than `published_since` with the time of their last snapshot"""
+        with self._get_conn() as conn:
+            rows = conn.execute('''
+                SELECT p.server_id, p.page_id, p.fb_post_id, p.published_at,
+                       (SELECT MAX(a.fetched_at) FROM facebook_analytics a
+                        WHERE a.post_id = p.fb_post_id) AS last_fetched_at
+                FROM facebook_posts p
+                WHERE p.status = 'published' AND p.published_at >= ? AND p.fb_post_id IS NOT NULL
+            ''', (published_since,)).fetchall()
+            return [dict(row) for row in rows]
+    
+    # Retention Methods
+    def find_downsampled_analytics(self, since, before, bucket_format, *modifiers):
+        """Ids of snapshots fetched in [since, before) that aren't their post's newest in their bucket
+        (strftime(bucket_format, fetched_at, *modifiers))"""
+        with self._get_conn() as conn:
+            rows = conn.execute(f'''
+                SELECT id FROM (
+                    SELECT id, ROW_NUMBER() OVER (
+                        PARTITION BY post_id, strftime(?, fetched_at{', ?' * len(modifiers)})
+                        ORDER BY fetched_at DESC, id DESC
+                    ) AS newest
+                    FROM facebook_analytics
+                    WHERE fetched_at >= ? AND fetched_at < ?
+                ) WHERE newest > 1
+            ''', (bucket_format, *modifiers, since, before)).fetchall()
+            return [row[0] for row in rows]
+    
+    def delete_facebook_analytics(self, ids):
+        with self._get_conn() as conn:
+            cur = conn.execute(
+                f"DELETE FROM facebook_analytics WHERE id IN ({', '.join('?' * len(ids))})", ids
+            )
+            conn.commit()
+            return cur.rowcount
+    
+    def retire_facebook_posts(self, before, limit, prune=False):
+        """Archive (or with `prune`, delete along with their snapshots) one batch of old finished posts"""
+        now = datetime.utcnow()
+        with self._get_conn() as conn:
+            ids = [row[0] for row in conn.execute(f'''
+                SELECT _id FROM facebook_posts
+                WHERE status IN ({', '.join('?' * len(TERMINAL_POST_STATUSES))})
+                  AND COALESCE(published_at, created_at) < ?
+                LIMIT ?
+            ''', (*TERMINAL_POST_STATUSES, before, limit)).fetchall()]
+            if not ids:
+                return 0
+            
+            marks = ', '.join('?' * len(ids))
+            if prune:
+                pruned = f'post_id IN (SELECT fb_post_id FROM facebook_posts WHERE _id IN ({marks}))'
+                # Take the posts' growth back out of the daily aggregates so they still match a rebuild
+                conn.execute(f'''
+                    UPDATE facebook_analytics_daily SET
+                        {', '.join(f'{name} = facebook_analytics_daily.{name} - pruned.{name}' for name in DAILY_METRICS)},
+                        snapshots = facebook_analytics_daily.snapshots - pruned.snapshots
+                    FROM ({daily_growth_sql('WHERE ' + pruned)}) AS pruned
+                    WHERE facebook_analytics_daily.server_id = pruned.server_id
+                      AND facebook_analytics_daily.page_id = pruned.page_id
+                      AND facebook_analytics_daily.day = pruned.day
+                ''', ids)
+                conn.execute('DELETE FROM facebook_analytics_daily WHERE snapshots <= 0')
+                conn.execute(f'DELETE FROM facebook_analytics_latest WHERE {pruned}', ids)
+                conn.execute(f'DELETE FROM facebook_analytics WHERE {pruned}', ids)
+            else:
+                conn.execute(f'''
+                    INSERT OR REPLACE INTO facebook_posts_archive
+                    SELECT *, ? FROM facebook_posts WHERE _id IN ({marks})
+                ''', (now, *ids))
+            conn.execute(f'DELETE FROM facebook_posts WHERE _id IN ({marks})', ids)
+            conn.commit()
+            return len(ids)
+    
+    def prune_publish_jobs(self, before, limit):
+        """Delete one batch of publish jobs that finished before `before`"""
+        with self._get_conn() as conn:
+            cur = conn.execute('''
+                DELETE FROM publish_jobs WHERE id IN (
+                    SELECT id FROM publish_jobs
+                    WHERE status IN ('done', 'failed') AND finished_at < ?
+                    LIMIT ?
+                )
+            ''', (before, limit))
+            conn.commit()
+            return cur.rowcount
+    
+    def incremental_vacuum_enabled(self):
+        """True when the database is in auto_vacuum=INCREMENTAL, the only mode incremental_vacuum works in"""
+        with self._get_conn() as conn:
+            return conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2
+    
+    def enable_incremental_vacuum(self):
+        """Switch an existing database to auto_vacuum=INCREMENTAL (one full VACUUM); True if it was converted"""
+        if self.incremental_vacuum_enabled():
+            return False
+        with self._get_conn() as conn:
+            conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            conn.execute('VACUUM')
+            print('Converted database to incremental auto_vacuum')
+            return True
+    
+    def incremental_vacuum(self, pages):
+        """Return up to `pages` free pages to the OS; returns how many free pages remain"""
+        with self._get_conn() as conn:
+            # The pragma frees one page per step and returns no rows, so execute() would
+            # stop after the first page; executescript() steps it to completion
+            conn.executescript(f'PRAGMA incremental_vacuum({int(pages)});')
+            return conn.execute('PRAGMA freelist_count').fetchone()[0]
+
+    def read(self, func, *args):
+        """Run func(conn, *args) on a pooled connection, for bulk readers like utils.analytics"""
+        with self._get_conn() as conn:
+            return func(conn, *args)
+
+    # Graph Response Cache Methods
+    def get_cached_response(self, cache_key):
+        with self._get_conn() as conn:
+            row = conn.execute('SELECT payload, fetched_at FROM graph_cache WHERE cache_key = ?', (cache_key,)).fetchone()
+            if row:
+                return json.loads(row['payload']), row['fetched_at']
+            return None
+    
+    def save_cached_response(self, cache_key, kind, page_id, payload, fetched_at):
+        with self._get_conn() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO graph_cache (cache_key, kind, page_id, payload, fetched_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (cache_key, kind, str(page_id), json.dumps(payload), fetched_at))
+            conn.commit()
+    
+    def delete_cached_responses(self, kind, page_id, cache_key=None):
+        with self._get_conn() as conn:
+            if cache_key:
+                conn.execute('DELETE FROM graph_cache WHERE cache_key = ?', (cache_key,))
+            else:
+                conn.execute('DELETE FROM graph_cache WHERE kind = ? AND page_id = ?', (kind, str(page_id)))
+            conn.commit()
+
+    def prune_cached_responses(self, before, limit):
+        """Delete one batch of cached responses fetched before `before` (a Unix timestamp)"""
+        with self._get_conn() as conn:
+            cur = conn.execute('''
+                DELETE FROM graph_cache WHERE cache_key IN (
+                    SELECT cache_key FROM graph_cache WHERE fetched_at < ? LIMIT ?
+                )
+            ''', (before, limit))
+            conn.commit()
+            return cur.rowcount
+
+    # Publish Queue Methods
+    def enqueue_publish_job(self, kind, payload, user_id, channel_id, message_id, ephemeral):
+        with self._get_conn() as conn:
+            now = datetime.utcnow()
+            cur = conn.execute('''
+                INSERT INTO publish_jobs
+                (kind, payload, status, user_id, channel_id, message_id, ephemeral, run_after, created_at)
+                VALUES (?, ?, 'queued', ?, ?, ?, ?, ?, ?)
+            ''', (kind, json.dumps(payload), user_id, channel_id, message_id, int(ephemeral), now, now))
             conn.commit()
             return cur.lastrowid
+    
+    def claim_publish_jobs(self, kinds, limit, lease_seconds):
+        """Atomically lease ready jobs of the given kinds (and jobs whose worker died) to this worker"""
+        now = datetime.utcnow()
+        kinds = list(kinds)
+        placeholders = ', '.join('?' * len(kinds))
+        with self._get_conn() as conn:
+            rows = conn.execute(f'''
+                UPDATE publish_jobs SET status = 'running', lease_until = ?, attempts = attempts + 1
+                WHERE id IN (
+                    SELECT id FROM publish_jobs
+                    WHERE status = 'queued' AND run_after <= ? AND kind IN ({placeholders})
+                    UNION ALL
+                    SELECT id FROM publish_jobs
+                    WHERE status = 'running' AND lease_until <= ? AND kind IN ({placeholders})
+                    LIMIT ?
+                )
+                RETURNING *
+            ''', (now + timedelta(seconds=lease_seconds), now, *kinds, now, *kinds, limit)).fetchall()
+            conn.commit()
+            jobs = [dict(row) for row in rows]
+            for job in jobs:
+                job['payload'] = json.loads(job['payload'])
+            return jobs
+    
+    def extend_publish_job_lease(self, job_id, lease_seconds):
+        with self._get_conn() as conn:
+            conn.execute("UPDATE publish_jobs SET lease_until = ? WHERE id = ? AND status = 'running'",
+                         (datetime.utcnow() + timedelta(seconds=lease_seconds), job_id))
+            conn.commit()
+    
+    def save_publish_job_payload(self, job_id, payload):
+        with self._get_conn() as conn:
+            conn.execute('UPDATE publish_jobs SET payload = ? WHERE id = ?', (json.dumps(payload), job_id))
+            conn.commit()
+    
+    def retry_publish_job(self, job_id, error, delay_seconds):
+        with self._get_conn() as conn:
+            conn.execute('''
+                UPDATE publish_jobs SET status = 'queued', error = ?, run_after = ?, lease_until = NULL
+                WHERE id = ?
+            ''', (error, datetime.utcnow() + timedelta(seconds=delay_seconds), job_id))
+            conn.commit()
+    
+    def finish_publish_job(self, job_id, status, result=None, error=None):
+        with self._get_conn() as conn:
+            conn.execute('''
+                UPDATE publish_jobs SET status = ?, result = ?, error = ?, lease_until = NULL, finished_at = ?
+                WHERE id = ?
+            ''', (status, json.dumps(result), error, datetime.utcnow(), job_id))
+            conn.commit()
+            print(f'Publish job {job_id} {status}')
+
+
+class AsyncDatabase:
+    """Async facade that runs Database calls on a dedicated executor"""
+    
+    def __init__(self, database):
+        self.sync = database
+        self.executor = ThreadPoolExecutor(
+            max_workers=database.pool.size,
+            thread_name_prefix='database'
+        )
+        # server_id -> decrypted account (or None when not connected)
+        self.accounts = TTLCache(config.ACCOUNT_CACHE_SIZE, config.ACCOUNT_CACHE_TTL)
+        self._accounts_version = 0
+    
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args))
+    
+    # Facebook Account Methods
+    def _invalidate_account(self, server_id):
+        self._accounts_version += 1
+        self.accounts.invalidate(str(server_id))
+    
+    async def save_facebook_account(self, server_id, account_data):
+        self._invalidate_account(server_id)
+        try:
+            return await self._run(self.sync.save_facebook_account, server_id, account_data)
         finally:
-            conn.close()
+            self._invalidate_account(server_id)
+    
+    async def get_facebook_account(self, server_id):
+        """Return the account from the cache, loading and decrypting on a miss"""
+        key = str(server_id)
+        account = self.accounts.get(key, MISSING)
+        if account is MISSING:
+            version = self._accounts_version
+            account = await self._run(self.sync.get_facebook_account, key)
+            # Skip caching if the account was saved or deleted meanwhile
+            if version == self._accounts_version:
+                self.accounts.set(key, account)
+        return dict(account) if account else None
+    
+    async def delete_facebook_account(self, server_id):
+        self._invalidate_account(server_id)
+        try:
+            return await self._run(self.sync.delete_facebook_account, server_id)
+        finally:
+            self._invalidate_account(server_id)
+    
+    # Post Methods
+    async def save_facebook_post(self, post_data):
+        return await self._run(self.sync.save_facebook_post, post_data)
+    
+    async def get_facebook_scheduled_posts(self):
+        return await self._run(self.sync.get_facebook_scheduled_posts)
+    
+    async def get_facebook_upcoming_posts(self):
+        return await self._run(self.sync.get_facebook_upcoming_posts)
+    
+    async def claim_facebook_scheduled_posts(self, limit, lease_seconds):
+        return await self._run(self.sync.claim_facebook_scheduled_posts, limit, lease_seconds)
+    
+    async def extend_facebook_post_lease(self, post_id, lease_until, lease_seconds):
+        return await self._run(self.sync.extend_facebook_post_lease, post_id, lease_until, lease_seconds)
+
+    async def update_facebook_post_status(self, post_id, status, fb_post_id=None, lease_until=None):
+        return await self._run(self.sync.update_facebook_post_status, post_id, status, fb_post_id, lease_until)
+    
+    async def save_facebook_analytics(self, analytics_data):
+        return await self._run(self.sync.save_facebook_analytics, analytics_data)
+    
+    async def save_facebook_analytics_many(self, snapshots):
+        return await self._run(self.sync.save_facebook_analytics_many, snapshots)
+    
+    async def get_facebook_posts_for_insights(self, published_since):
+        return await self._run(self.sync.get_facebook_posts_for_insights, published_since)
+    
+    async def rebuild_facebook_daily_analytics(self):
+        return await self._run(self.sync.rebuild_facebook_daily_analytics)
+    
+    async def get_facebook_daily_analytics(self, server_id, since_day):
+        return await self._run(self.sync.get_facebook_daily_analytics, server_id, since_day)
+    
+    async def get_facebook_analytics_totals(self, server_id):
+        return await self._run(self.sync.get_facebook_analytics_totals, server_id)
+    
+    # Retention Methods
+    async def find_downsampled_analytics(self, since, before, bucket_format, *modifiers):
+        return await self._run(self.sync.find_downsampled_analytics, since, before, bucket_format, *modifiers)
+    
+    async def delete_facebook_analytics(self, ids):
+        return await self._run(self.sync.delete_facebook_analytics, ids)
+    
+    async def retire_facebook_posts(self, before, limit, prune=False):
+        return await self._run(self.sync.retire_facebook_posts, before, limit, prune)
+    
+    async def prune_publish_jobs(self, before, limit):
+        return await self._run(self.sync.prune_publish_jobs, before, limit)
+    
+    async def incremental_vacuum_enabled(self):
+        return await self._run(self.sync.incremental_vacuum_enabled)
+    
+    async def enable_incremental_vacuum(self):
+        return await self._run(self.sync.enable_incremental_vacuum)
+    
+    async def incremental_vacuum(self, pages):
+        return await self._run(self.sync.incremental_vacuum, pages)
+    
+    async def read(self, func, *args):
+        return await self._run(self.sync.read, func, *args)
+    
+    # Graph Response Cache Methods
+    async def get_cached_response(self, cache_key):
+        return await self._run(self.sync.get_cached_response, cache_key)
+    
+    async def save_cached_response(self, cache_key, kind, page_id, payload, fetched_at):
+        return await self._run(self.sync.save_cached_response, cache_key, kind, page_id, payload, fetched_at)
+    
+    async def delete_cached_responses(self, kind, page_id, cache_key=None):
+        return await self._run(self.sync.delete_cached_responses, kind, page_id, cache_key)
+    
+    async def prune_cached_responses(self, before, limit):
+        return await self._run(self.sync.prune_cached_responses, before, limit)
+    
+    # Publish Queue Methods
+    async def enqueue_publish_job(self, kind, payload, user_id, channel_id, message_id, ephemeral):
+        return await self._run(self.sync.enqueue_publish_job, kind, payload, user_id, channel_id, message_id, ephemeral)
+    
+    async def claim_publish_jobs(self, kinds, limit, lease_seconds):
+        return await self._run(self.sync.claim_publish_jobs, kinds, limit, lease_seconds)
+    
+    async def extend_publish_job_lease(self, job_id, lease_seconds):
+        return await self._run(self.sync.extend_publish_job_lease, job_id, lease_seconds)
+    
+    async def save_publish_job_payload(self, job_id, payload):
+        return await self._run(self.sync.save_publish_job_payload, job_id, payload)
+    
+    async def retry_publish_job(self, job_id, error, delay_seconds):
+        return await self._run(self.sync.retry_publish_job, job_id, error, delay_seconds)
+    
+    async def finish_publish_job(self, job_id, status, result=None, error=None):
+        return await self._run(self.sync.finish_publish_job, job_id, status, result, error)
+    
+    def close(self):
+        """Stop the executor and close pooled connections"""
+        self.executor.shutdown(wait=True)
+        self.sync.pool.close()
+
 
 # Global database instance
-db = Database()
+db = AsyncDatabase(Database())
 
 # --- INSTAGRAM / FUNCTIONAL PART (Maintained for compatibility) ---
 def create_tables(conn):
@@ -0,0 +1,179 @@
+"""
+Columnar export of posts and analytics for offline analysis
+Streams tables into Parquet or Arrow IPC files partitioned by server and month
+
+Run from the project root: python -m utils.export [--full] [--format arrow] [--out DIR]
+"""
+
+import argparse
+import os
+import shutil
+from datetime import datetime
+import pyarrow as pa
+import pyarrow.parquet as pq
+import config
+
+# SQLite timestamp text -> exact epoch microseconds, so Arrow gets int64 instead of strings to parse
+TIMESTAMP_US = "CAST(strftime('%s', {0}) AS INTEGER) * 1000000 + COALESCE(CAST(substr({0}, 21, 6) AS INTEGER), 0)"
+
+TIMESTAMP = pa.timestamp('us', tz='UTC')
+
+# Exported tables: row id column, partitioning time column, and (name, type, SQL) per output column.
+# server_id is left out of the files, it is only the server_id= partition key readers add back
+TABLES = {
+    'facebook_posts': {
+        'id': '_id',
+        'time': 'created_at',
+        'columns': [
+            ('_id', pa.int64(), '_id'),
+            ('page_id', pa.string(), 'page_id'),
+            ('fb_post_id', pa.string(), 'fb_post_id'),
+            ('message', pa.string(), 'message'),
+            ('link', pa.string(), 'link'),
+            ('image_url', pa.string(), 'image_url'),
+            ('status', pa.string(), 'status'),
+            ('platform', pa.string(), 'platform'),
+            ('scheduled_at', TIMESTAMP, TIMESTAMP_US.format('scheduled_at')),
+            ('published_at', TIMESTAMP, TIMESTAMP_US.format('published_at')),
+            ('created_at', TIMESTAMP, TIMESTAMP_US.format('created_at')),
+        ],
+    },
+    'facebook_analytics': {
+        'id': 'id',
+        'time': 'fetched_at',
+        'columns': [
+            ('id', pa.int64(), 'id'),
+            ('post_id', pa.string(), 'post_id'),
+            ('post_impressions', pa.int64(), 'post_impressions'),
+            ('post_engaged_users', pa.int64(), 'post_engaged_users'),
+            ('post_clicks', pa.int64(), 'post_clicks'),
+            ('fetched_at', TIMESTAMP, TIMESTAMP_US.format('fetched_at')),
+            ('raw_data', pa.string(), 'raw_data'),
+        ],
+    },
+}
+
+
+class PartitionWriter:
+    """Writes one partition file at a time; rows arrive grouped by partition, so memory stays flat"""
+
+    def __init__(self, root, schema, file_format, stamp):
+        self.root = root
+        self.schema = schema
+        self.file_format = file_format
+        self.stamp = stamp
+        self.key = None
+        self.writer = None
+        self.files = 0
+
+    def write(self, key, table):
+        if key != self.key:
+            self.close()
+            server_id, month = key
+            directory = os.path.join(self.root, f'server_id={server_id or "unknown"}', f'month={month or "unknown"}')
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f'part-{self.stamp}.{self.file_format}')
+            if self.file_format == 'parquet':
+                self.writer = pq.ParquetWriter(path, self.schema, compression='zstd')
+            else:
+                self.writer = pa.ipc.new_file(path, self.schema)
+            self.key = key
+            self.files += 1
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+            self.writer = None
+            self.key = None
+
+
+def export_table(conn, table, out_dir, file_format='parquet', full=False):
+    """Stream `table` (only rows past its watermark unless `full`) into partition files; returns (rows, files)"""
+    spec = TABLES[table]
+    schema = pa.schema([(name, kind) for name, kind, _ in spec['columns']])
+    root = os.path.join(out_dir, table)
+    destination = os.path.abspath(root)
+
+    last_id = 0
+    if full:
+        # A full export replaces the previous files rather than duplicating them
+        shutil.rmtree(root, ignore_errors=True)
+    else:
+        row = conn.execute(
+            'SELECT last_id FROM export_watermarks WHERE table_name = ? AND destination = ?', (table, destination)
+        ).fetchone()
+        last_id = row[0] if row else 0
+
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    cursor.execute(f'''
+        SELECT {', '.join(sql for _, _, sql in spec['columns'])},
+               server_id, strftime('%Y-%m', {spec['time']})
+        FROM {table}
+        WHERE {spec['id']} > ?
+        ORDER BY server_id, {spec['time']}, {spec['id']}
+    ''', (last_id,))
+
+    writer = PartitionWriter(root, schema, file_format, datetime.utcnow().strftime('%Y%m%dT%H%M%S'))
+    rows = 0
+    max_id = last_id
+    width = len(spec['columns'])
+    try:
+        while True:
+            chunk = cursor.fetchmany(config.EXPORT_CHUNK_ROWS)
+            if not chunk:
+                break
+            columns = list(zip(*chunk))
+            batch = pa.table(
+                [pa.array(values, type=kind) for values, (_, kind, _) in zip(columns, spec['columns'])],
+                schema=schema
+            )
+            keys = list(zip(columns[width], columns[width + 1]))
+
+            # Hand each run of same-partition rows to the writer
+            start = 0
+            for i in range(1, len(keys) + 1):
+                if i == len(keys) or keys[i] != keys[start]:
+                    writer.write(keys[start], batch.slice(start, i - start))
+                    start = i
+
+            rows += len(chunk)
+            max_id = max(max_id, max(columns[0]))
+    finally:
+        writer.close()
+
+    # A full export cleared the tree, so its watermark restarts even when no rows came back
+    if rows or full:
+        conn.execute(
+            'INSERT OR REPLACE INTO export_watermarks (table_name, destination, last_id, exported_at) VALUES (?, ?, ?, ?)',
+            (table, destination, max_id, datetime.utcnow())
+        )
+        conn.commit()
+    return rows, writer.files
+
+
+def export_all(conn, out_dir, file_format='parquet', full=False):
+    """Export every table in TABLES; runs on a database worker thread"""
+    return {table: export_table(conn, table, out_dir, file_format, full) for table in TABLES}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export posts and analytics to partitioned Parquet/Arrow files')
+    parser.add_argument('--out', default=config.EXPORT_DIR, help='output directory')
+    parser.add_argument('--format', default=config.EXPORT_FORMAT, choices=('parquet', 'arrow'))
+    parser.add_argument('--full', action='store_true',
+                        help='re-export everything instead of only rows added since the last export')
+    args = parser.parse_args()
+
+    from utils.database import db
+    try:
+        results = db.sync.read(export_all, args.out, args.format, args.full)
+    finally:
+        db.close()
+    for table, (rows, files) in results.items():
+        print(f'{table}: {rows} rows into {files} files under {os.path.join(args.out, table)}')
+
+
+if __name__ == '__main__':
+    main()
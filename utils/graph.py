@@ -0,0 +1,81 @@
+"""
+Graph API HTTP client for Facebook Discord Bot
+Keeps one pooled aiohttp session alive for all Graph API traffic
+"""
+
+import asyncio
+import json
+import aiohttp
+import config
+
+
+class GraphResponse:
+    """Buffered response returned by GraphClient"""
+
+    def __init__(self, status, headers, text):
+        self.status = status
+        self.headers = headers
+        self.text = text
+
+    def json(self):
+        """Decode the response body as JSON"""
+        return json.loads(self.text) if self.text else {}
+
+
+class GraphClient:
+    """Long-lived HTTP client with a tuned, shared connection pool"""
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout or config.GRAPH_REQUEST_TIMEOUT
+        self.session = None
+        self._lock = asyncio.Lock()
+
+    def _make_connector(self):
+        return aiohttp.TCPConnector(
+            limit=config.GRAPH_MAX_CONNECTIONS,
+            limit_per_host=config.GRAPH_MAX_CONNECTIONS_PER_HOST,
+            ttl_dns_cache=config.GRAPH_DNS_CACHE_TTL,
+            keepalive_timeout=config.GRAPH_KEEPALIVE_TIMEOUT,
+            enable_cleanup_closed=True
+        )
+
+    async def get_session(self):
+        """Return the shared session, creating it on first use"""
+        if self.session and not self.session.closed:
+            return self.session
+
+        async with self._lock:
+            if not self.session or self.session.closed:
+                self.session = aiohttp.ClientSession(
+                    connector=self._make_connector(),
+                    timeout=aiohttp.ClientTimeout(total=self.timeout),
+                    headers={'Connection': 'keep-alive'}
+                )
+        return self.session
+
+    async def request(self, method, url, params=None, data=None):
+        """Send a request and return the fully read response"""
+        session = await self.get_session()
+        async with session.request(method, url, params=params, data=data) as resp:
+            text = await resp.text()
+            return GraphResponse(resp.status, resp.headers, text)
+
+    async def get(self, url, params=None):
+        return await self.request('GET', url, params=params)
+
+    async def post(self, url, params=None, data=None):
+        return await self.request('POST', url, params=params, data=data)
+
+    async def delete(self, url, params=None):
+        return await self.request('DELETE', url, params=params)
+
+    async def close(self):
+        """Close the session and release pooled connections"""
+        if self.session and not self.session.closed:
+            await self.session.close()
+            print('Graph HTTP session closed')
+        self.session = None
+
+
+# Global Graph client
+graph = GraphClient()
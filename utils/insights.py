@@ -0,0 +1,117 @@
+"""
+Background insights collector for published Facebook posts
+Snapshots post insights into facebook_analytics often while posts are fresh and rarely once they age
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+import config
+from utils.scheduler import parse_timestamp
+
+
+def snapshot_interval(age):
+    """Seconds between snapshots for a post `age` seconds old, or None once it is too old to track"""
+    for max_age, interval in config.INSIGHTS_SCHEDULE:
+        if age < max_age:
+            return interval
+    return None
+
+
+class InsightsCollector:
+    """Periodically stores insights snapshots for recently published posts"""
+
+    def __init__(self):
+        self.fetch_callback = None  # async (account, post_id) -> insights dict
+        self.budget_callback = None  # page_id -> calls the page can make right now
+        self.task = None
+
+    def set_fetch_callback(self, callback, budget=None):
+        self.fetch_callback = callback
+        self.budget_callback = budget
+
+    def page_budget(self, page_id):
+        """Calls this round may spend on the page without delaying its other traffic"""
+        if not self.budget_callback:
+            return config.GRAPH_BATCH_MAX_SIZE
+        return self.budget_callback(page_id) - config.INSIGHTS_RESERVED_CALLS
+
+    def due_posts(self, posts, now):
+        """Posts whose next snapshot is due, most overdue first"""
+        due = []
+        for post in posts:
+            published_at = parse_timestamp(post['published_at'])
+            interval = snapshot_interval((now - published_at).total_seconds())
+            if interval is None:
+                continue
+            last = post['last_fetched_at']
+            overdue = (now - parse_timestamp(last)).total_seconds() - interval if last else float('inf')
+            if overdue >= 0:
+                due.append((overdue, post))
+        due.sort(key=lambda item: item[0], reverse=True)
+        return [post for _, post in due[:config.INSIGHTS_MAX_PER_RUN]]
+
+    async def collect(self, db):
+        """Take one round of snapshots; returns how many were stored"""
+        if not self.fetch_callback:
+            return 0
+
+        now = datetime.utcnow()
+        horizon = now - timedelta(seconds=config.INSIGHTS_SCHEDULE[-1][0])
+        posts = self.due_posts(await db.get_facebook_posts_for_insights(horizon), now)
+        if not posts:
+            return 0
+
+        async def snapshot(post):
+            account = await db.get_facebook_account(post['server_id'])
+            if not account or account['page_id'] != post['page_id']:
+                return None
+            try:
+                insights = await self.fetch_callback(account, post['fb_post_id'])
+            except Exception as e:
+                print(f'Error collecting insights for {post["fb_post_id"]}: {e}')
+                return None
+            return {'post_id': post['fb_post_id'], 'server_id': post['server_id'], **insights}
+
+        async def collect_page(page_id, page_posts):
+            # Only spend tokens the page has spare, so commands and scheduled posts never queue behind us
+            stored = 0
+            while page_posts:
+                size = min(config.GRAPH_BATCH_MAX_SIZE, self.page_budget(page_id))
+                if size <= 0:
+                    break
+                chunk, page_posts = page_posts[:size], page_posts[size:]
+                # Fetched together, so the Graph batcher folds each chunk into one batch request
+                snapshots = [s for s in await asyncio.gather(*(snapshot(post) for post in chunk)) if s]
+                if snapshots:
+                    await db.save_facebook_analytics_many(snapshots)
+                stored += len(snapshots)
+            return stored
+
+        by_page = {}
+        for post in posts:
+            by_page.setdefault(post['page_id'], []).append(post)
+        stored = sum(await asyncio.gather(*(collect_page(*item) for item in by_page.items())))
+        print(f'Collected insights for {stored} of {len(posts)} due posts')
+        return stored
+
+    async def run(self, db):
+        while True:
+            try:
+                await self.collect(db)
+            except Exception as e:
+                print(f'Error collecting insights: {e}')
+            await asyncio.sleep(config.INSIGHTS_COLLECT_INTERVAL)
+
+    def start(self, db):
+        if not self.task or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self.run(db))
+            print(f'Insights collector started (runs every {config.INSIGHTS_COLLECT_INTERVAL}s)')
+
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+
+# Global insights collector
+insights_collector = InsightsCollector()
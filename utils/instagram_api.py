@@ -0,0 +1,63 @@
+"""
+Instagram Graph API client
+Async access to graph.instagram.com on the bot's event loop
+"""
+
+import asyncio
+import aiohttp
+import config
+from utils.graph import GraphClient
+from utils.paging import paginate
+
+
+class InstagramClient:
+    """Async Instagram Graph client with a pooled session and timeouts"""
+
+    def __init__(self):
+        self.base_url = config.INSTAGRAM_GRAPH_URL
+        self.http = GraphClient(timeout=config.INSTAGRAM_REQUEST_TIMEOUT)
+
+    async def request(self, method, endpoint, params=None, data=None):
+        """Call an endpoint and return the decoded JSON body"""
+        url = f"{self.base_url}/{endpoint}"
+        try:
+            resp = await self.http.request(method, url, params=params, data=data)
+        except asyncio.TimeoutError:
+            return {"error": "timeout", "endpoint": endpoint}
+        except aiohttp.ClientConnectorError as e:
+            # Never reached Instagram, nothing was sent
+            return {"error": "connection_error", "text": str(e)}
+        except aiohttp.ClientError as e:
+            # Sent, but the connection broke before an answer came back
+            return {"error": "no_response", "text": str(e)}
+
+        try:
+            return resp.json()
+        except ValueError:
+            return {"error": "invalid_json_response", "status_code": resp.status, "text": resp.text}
+
+    async def get(self, endpoint, params):
+        return await self.request('GET', endpoint, params=params)
+
+    async def post(self, endpoint, params):
+        return await self.request('POST', endpoint, data=params)
+
+    async def delete(self, endpoint, params):
+        return await self.request('DELETE', endpoint, params=params)
+
+    def paginate(self, endpoint, params, limit=None):
+        """Stream every item of a paginated edge, prefetching the next page"""
+        async def fetch(page_params):
+            page = await self.get(endpoint, page_params)
+            if 'error' in page:
+                raise Exception(f"Instagram API error: {page['error']}")
+            return page
+
+        return paginate(fetch, params, limit)
+
+    async def close(self):
+        await self.http.close()
+
+
+# Global Instagram client
+instagram = InstagramClient()
@@ -3,11 +3,11 @@ OAuth handler for Facebook Pages
 Manages Facebook authentication and token exchange
 """
 
-import aiohttp
 from urllib.parse import urlencode
 from aiohttp import web
 import asyncio
 import config
+from utils.graph import graph
 
 
 class FacebookOAuth:
@@ -41,14 +41,10 @@ class FacebookOAuth:
             'code': code
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(config.FACEBOOK_TOKEN_URL, params=params) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    return data.get('access_token')
-                else:
-                    error = await resp.text()
-                    raise Exception(f"Token exchange failed: {error}")
+        resp = await graph.get(config.FACEBOOK_TOKEN_URL, params=params)
+        if resp.status == 200:
+            return resp.json().get('access_token')
+        raise Exception(f"Token exchange failed: {resp.text}")
     
     async def get_long_lived_token(self, short_token):
         """Get long-lived user token (60 days)"""
@@ -59,12 +55,10 @@ class FacebookOAuth:
             'fb_exchange_token': short_token
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(config.FACEBOOK_TOKEN_URL, params=params) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    return data.get('access_token')
-                return short_token  # Return original if exchange fails
+        resp = await graph.get(config.FACEBOOK_TOKEN_URL, params=params)
+        if resp.status == 200:
+            return resp.json().get('access_token')
+        return short_token  # Return original if exchange fails
     
     async def get_user_pages(self, user_token):
         """Get list of pages user manages"""
@@ -74,13 +68,10 @@ class FacebookOAuth:
             'fields': 'id,name,access_token,tasks'
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as resp:
-                if resp.status == 200:
-                    return await resp.json()
-                else:
-                    error = await resp.text()
-                    raise Exception(f"Failed to get pages: {error}")
+        resp = await graph.get(url, params=params)
+        if resp.status == 200:
+            return resp.json()
+        raise Exception(f"Failed to get pages: {resp.text}")
     
     async def handle_callback(self, request):
         """Handle OAuth callback from Facebook"""
@@ -0,0 +1,35 @@
+"""
+Cursor pagination for Graph API edges
+Streams items page by page while the next page is fetched in the background
+"""
+
+import asyncio
+
+
+async def paginate(fetch, params, limit=None):
+    """Yield up to `limit` items from a cursor-paginated edge; fetch(params) returns one decoded page"""
+    remaining = limit
+    pending = asyncio.ensure_future(fetch(dict(params)))
+    try:
+        while pending is not None:
+            page = await pending
+            pending = None
+
+            items = page.get('data') or []
+            if remaining is not None:
+                items = items[:remaining]
+                remaining -= len(items)
+
+            paging = page.get('paging') or {}
+            after = (paging.get('cursors') or {}).get('after')
+            if items and after and paging.get('next') and remaining != 0:
+                # Fetch the next page while the caller works through this one
+                pending = asyncio.ensure_future(fetch({**params, 'after': after}))
+
+            for item in items:
+                yield item
+    finally:
+        if pending is not None:
+            # The caller stopped early; drop the prefetch without leaking its error
+            pending.cancel()
+            pending.add_done_callback(lambda task: task.cancelled() or task.exception())
@@ -0,0 +1,147 @@
+"""
+Background publish queue
+Slash commands enqueue jobs in SQLite and return; workers publish and report back on the original message
+"""
+
+import asyncio
+import discord
+import config
+from utils.database import db
+
+
+class PermanentFailure(Exception):
+    """Raised by a handler when retrying could publish the same post twice"""
+
+
+class PublishQueue:
+    """Durable job queue drained by async workers"""
+
+    def __init__(self, database):
+        self.database = database
+        self.handlers = {}  # kind -> async handler(payload, report, checkpoint) returning (content, embed)
+        self.messages = {}  # job_id -> interaction message, edited while its token is still valid
+        self.wakeup = asyncio.Event()
+        self.workers = []
+        self.bot = None
+
+    def register(self, kind, handler):
+        """Route jobs of this kind to an async handler"""
+        self.handlers[kind] = handler
+
+    def unregister(self, kind):
+        """Stop routing this kind; the workers stop once no cog has a handler left"""
+        self.handlers.pop(kind, None)
+        if not self.handlers:
+            self.stop()
+
+    def start(self, bot):
+        """Start the workers (once, however many cogs register handlers)"""
+        self.bot = bot
+        if self.workers:
+            return
+        self.workers = [asyncio.create_task(self.work()) for _ in range(config.PUBLISH_WORKERS)]
+        print(f'Publish queue started with {config.PUBLISH_WORKERS} workers')
+
+    def stop(self):
+        for worker in self.workers:
+            worker.cancel()
+        self.workers = []
+
+    async def enqueue(self, interaction, kind, payload, message):
+        """Queue a job; progress and the result are reported by editing `message`"""
+        job_id = await self.database.enqueue_publish_job(
+            kind,
+            payload,
+            str(interaction.user.id),
+            str(interaction.channel_id),
+            str(message.id),
+            message.flags.ephemeral
+        )
+        self.messages[job_id] = message
+        self.wakeup.set()
+        return job_id
+
+    async def work(self):
+        while True:
+            try:
+                # Clear before claiming so an enqueue during the claim still wakes us
+                self.wakeup.clear()
+                jobs = await self.database.claim_publish_jobs(
+                    self.handlers.keys(), 1, config.PUBLISH_JOB_LEASE
+                ) if self.handlers else []
+                if jobs:
+                    await self.run(jobs[0])
+                    continue
+
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), config.PUBLISH_QUEUE_POLL)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f'Error in publish worker: {e}')
+                await asyncio.sleep(config.PUBLISH_QUEUE_POLL)
+
+    async def run(self, job):
+        """Run one claimed job, keeping its lease alive however long the handler takes"""
+        heartbeat = asyncio.create_task(self.heartbeat(job['id']))
+        try:
+            content, embed = await self.handlers[job['kind']](
+                job['payload'],
+                lambda text: self.notify(job, content=text),
+                lambda **fields: self.checkpoint(job, **fields)
+            )
+        except Exception as e:
+            if job['attempts'] < config.PUBLISH_MAX_ATTEMPTS and not isinstance(e, PermanentFailure):
+                delay = config.PUBLISH_RETRY_DELAY * 2 ** (job['attempts'] - 1)
+                await self.database.retry_publish_job(job['id'], str(e), delay)
+                await self.notify(job, content=f" Publishing failed ({e}), retrying in {delay}s")
+            else:
+                await self.database.finish_publish_job(job['id'], 'failed', error=str(e))
+                await self.notify(job, content=f" Publishing failed: {e}", final=True)
+            return
+        finally:
+            heartbeat.cancel()
+
+        await self.database.finish_publish_job(job['id'], 'done', result={
+            'content': content,
+            'embed': embed.to_dict() if embed else None
+        })
+        await self.notify(job, content=content, embed=embed, final=True)
+
+    async def checkpoint(self, job, **fields):
+        """Persist progress into the job's payload, so a retry resumes after it instead of redoing it"""
+        job['payload'].update(fields)
+        await self.database.save_publish_job_payload(job['id'], job['payload'])
+
+    async def heartbeat(self, job_id):
+        while True:
+            await asyncio.sleep(config.PUBLISH_JOB_LEASE / 3)
+            await self.database.extend_publish_job_lease(job_id, config.PUBLISH_JOB_LEASE)
+
+    async def notify(self, job, content=None, embed=None, final=False):
+        """Edit the job's message; fall back to the channel API, then a DM, once the interaction expires"""
+        message = self.messages.pop(job['id'], None) if final else self.messages.get(job['id'])
+        try:
+            if message is not None:
+                try:
+                    await message.edit(content=content, embed=embed)
+                    return
+                except discord.HTTPException:
+                    # Interaction token expired (15 minutes), stop using it
+                    self.messages.pop(job['id'], None)
+
+            if not job['ephemeral'] and job['message_id']:
+                channel = self.bot.get_channel(int(job['channel_id'])) or await self.bot.fetch_channel(int(job['channel_id']))
+                await channel.get_partial_message(int(job['message_id'])).edit(content=content, embed=embed)
+            elif final:
+                # Ephemeral messages can't be edited without the interaction, so tell the user directly
+                user = self.bot.get_user(int(job['user_id'])) or await self.bot.fetch_user(int(job['user_id']))
+                await user.send(content=content, embed=embed)
+        except Exception as e:
+            print(f'Error reporting publish job {job["id"]}: {e}')
+
+
+# Global publish queue
+publish_queue = PublishQueue(db)
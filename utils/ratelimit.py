@@ -0,0 +1,193 @@
+"""
+Rate limiting for the Facebook Graph API
+Paces requests from the usage headers Graph returns on every response
+"""
+
+import asyncio
+import json
+import time
+import config
+
+# Graph error codes for app (4), user (17), page (32) and generic (613) throttling
+THROTTLE_ERROR_CODES = {4, 17, 32, 613}
+
+
+class UsageBudget:
+    """Latest usage reported by Graph for one scope (the app or one page)"""
+
+    def __init__(self):
+        self.percent = 0.0
+        self.updated_at = None
+        self.regain_at = 0.0
+
+    def update(self, percent, regain_seconds=0):
+        now = time.monotonic()
+        self.percent = percent
+        self.updated_at = now
+        if regain_seconds:
+            self.regain_at = max(self.regain_at, now + regain_seconds)
+
+    def current_percent(self):
+        """Usage decayed linearly over the rolling window since it was reported"""
+        if self.updated_at is None:
+            return 0.0
+        elapsed = time.monotonic() - self.updated_at
+        return max(0.0, self.percent * (1 - elapsed / config.RATE_LIMIT_WINDOW))
+
+    def delay(self):
+        """Seconds to wait before the next call in this scope"""
+        now = time.monotonic()
+        if self.regain_at > now:
+            return self.regain_at - now
+
+        percent = self.current_percent()
+        threshold = config.FACEBOOK_USAGE_PACE_THRESHOLD
+        if percent < threshold:
+            return 0.0
+        if percent >= 100:
+            return config.FACEBOOK_THROTTLE_BACKOFF
+        # Grow the delay quadratically as the budget runs out
+        pressure = (percent - threshold) / (100 - threshold)
+        return config.FACEBOOK_USAGE_MAX_PACE * pressure ** 2
+
+
+def parse_usage(value):
+    """Return (percent, regain_seconds) from an X-*-Usage header value"""
+    try:
+        return usage_report(json.loads(value))
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def usage_report(usage):
+    """Return (percent, regain_seconds) from one decoded usage object"""
+    percent = max(
+        float(usage.get('call_count', 0)),
+        float(usage.get('total_cputime', 0)),
+        float(usage.get('total_time', 0))
+    )
+    regain_minutes = float(usage.get('estimated_time_to_regain_access', 0))
+    return percent, regain_minutes * 60
+
+
+class TokenBucket:
+    """GCRA token bucket: O(1) acquire, FIFO slots and no herd after sleeping"""
+
+    def __init__(self, rate, burst):
+        self.interval = 1 / rate
+        self.tolerance = self.interval * (burst - 1)
+        self.tat = 0.0  # theoretical arrival time of the next call
+
+    def reserve(self, now=None):
+        """Claim the next slot and return how long the caller must wait for it"""
+        now = time.monotonic() if now is None else now
+        tat = max(self.tat, now)
+        self.tat = tat + self.interval
+        return max(0.0, tat - self.tolerance - now)
+
+    def idle(self, now):
+        return self.tat <= now
+
+    def available(self, now=None):
+        """Calls that could be made right now without waiting"""
+        now = time.monotonic() if now is None else now
+        return max(0, int((now + self.tolerance - max(self.tat, now)) / self.interval + 1e-9) + 1)
+
+
+class RateLimiter:
+    """Rate limiter for Facebook API"""
+
+    def __init__(self):
+        self.rate = config.FACEBOOK_MAX_CALLS / config.RATE_LIMIT_WINDOW
+        self.burst = config.FACEBOOK_BURST
+        self.buckets = {}  # page_id -> TokenBucket
+        self.app_usage = UsageBudget()
+        self.page_usage = {}  # page_id -> UsageBudget
+
+    def _page_budget(self, page_id):
+        if page_id not in self.page_usage:
+            self.page_usage[page_id] = UsageBudget()
+        return self.page_usage[page_id]
+
+    def observe(self, page_id, response):
+        """Record the usage headers (and throttling errors) from a Graph response"""
+        headers = response.headers
+
+        app = parse_usage(headers.get('X-App-Usage'))
+        if app:
+            self.app_usage.update(*app)
+
+        if page_id:
+            budget = self._page_budget(page_id)
+            reports = []
+            page = parse_usage(headers.get('X-Page-Usage'))
+            if page:
+                reports.append(page)
+            reports.extend(self._business_usage(headers.get('X-Business-Use-Case-Usage')))
+            if reports:
+                budget.update(
+                    max(percent for percent, _ in reports),
+                    max(regain for _, regain in reports)
+                )
+
+        if response.status != 200:
+            self._observe_error(page_id, response)
+
+    def _business_usage(self, value):
+        try:
+            usage = json.loads(value) if value else {}
+        except ValueError:
+            return []
+        if not isinstance(usage, dict):
+            return []
+        return [
+            usage_report(entry)
+            for entries in usage.values() if isinstance(entries, list)
+            for entry in entries if isinstance(entry, dict)
+        ]
+
+    def _observe_error(self, page_id, response):
+        try:
+            code = response.json().get('error', {}).get('code')
+        except ValueError:
+            return
+        if code not in THROTTLE_ERROR_CODES:
+            return
+
+        budget = self._page_budget(page_id) if code == 32 and page_id else self.app_usage
+        budget.update(100.0, config.FACEBOOK_THROTTLE_BACKOFF)
+        print(f'  Facebook throttled request (code {code}), backing off {config.FACEBOOK_THROTTLE_BACKOFF}s')
+
+    def _bucket(self, page_id):
+        bucket = self.buckets.get(page_id)
+        if bucket is None:
+            if len(self.buckets) >= config.RATE_LIMIT_MAX_BUCKETS:
+                self._prune_buckets()
+            bucket = self.buckets[page_id] = TokenBucket(self.rate, self.burst)
+        return bucket
+
+    def _prune_buckets(self):
+        """Drop buckets that are back at full burst, they hold no state"""
+        now = time.monotonic()
+        for page_id in [key for key, bucket in self.buckets.items() if bucket.idle(now)]:
+            del self.buckets[page_id]
+
+    def spare(self, page_id=None):
+        """Calls the page's bucket can take right now without making anyone wait"""
+        bucket = self.buckets.get(page_id)
+        return bucket.available() if bucket else self.burst
+
+    async def wait(self, page_id=None):
+        """Wait for a slot in the page's bucket and for the app and page budgets"""
+        delay = self._bucket(page_id).reserve()
+        if delay > 0:
+            if delay >= 1:
+                print(f'  Facebook rate limit reached for page {page_id}, waiting {delay:.0f}s')
+            await asyncio.sleep(delay)
+
+        delay = self.app_usage.delay()
+        if page_id in self.page_usage:
+            delay = max(delay, self.page_usage[page_id].delay())
+        if delay > 0:
+            print(f'  Facebook usage high, pacing request for {delay:.1f}s')
+            await asyncio.sleep(delay)
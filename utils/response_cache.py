@@ -0,0 +1,76 @@
+"""
+Graph response cache for Facebook Discord Bot
+Per-endpoint TTLs in memory, optionally persisted to SQLite
+"""
+
+import time
+import config
+from utils.cache import TTLCache
+from utils.database import db
+
+
+class ResponseCache:
+    """Caches slow-changing Graph reads (page info, feed, insights)"""
+
+    def __init__(self, database=None):
+        self.ttls = config.RESPONSE_CACHE_TTLS
+        # Entries outlive their TTL so stale-while-revalidate has a snapshot to serve
+        self.max_age = config.RESPONSE_CACHE_STALE_TTL
+        self.entries = TTLCache(config.RESPONSE_CACHE_SIZE, self.max_age)
+        self.database = database if config.RESPONSE_CACHE_PERSIST else None
+
+    @staticmethod
+    def _cache_key(kind, page_id, key):
+        return f"{kind}:{page_id}:{key}"
+
+    async def get(self, kind, page_id, key='', stale=False):
+        """Return (data, age_seconds) for a fresh entry (or any snapshot if stale), or None"""
+        cache_key = self._cache_key(kind, page_id, key)
+        entry = self.entries.get(cache_key)
+
+        if entry is None and self.database:
+            entry = await self.database.get_cached_response(cache_key)
+            if entry and time.time() - entry[1] < self.max_age:
+                # Promote warm data from before a restart into memory
+                self.entries.set(cache_key, entry, self.max_age - (time.time() - entry[1]))
+            else:
+                entry = None
+
+        if entry is None:
+            return None
+        data, fetched_at = entry
+        age = time.time() - fetched_at
+        if age >= self.ttls[kind] and not stale:
+            return None
+        return data, age
+
+    def is_fresh(self, kind, age):
+        return age < self.ttls[kind]
+
+    async def set(self, kind, page_id, key, data):
+        cache_key = self._cache_key(kind, page_id, key)
+        fetched_at = time.time()
+        self.entries.set(cache_key, (data, fetched_at))
+        if self.database:
+            await self.database.save_cached_response(cache_key, kind, page_id, data, fetched_at)
+
+    async def invalidate(self, kind, page_id, key=None):
+        """Drop one entry, or every entry of this kind for the page"""
+        if key is not None:
+            cache_key = self._cache_key(kind, page_id, key)
+            self.entries.invalidate(cache_key)
+        else:
+            cache_key = None
+            prefix = self._cache_key(kind, page_id, '')
+            self.entries.invalidate_matching(lambda k: k.startswith(prefix))
+        if self.database:
+            await self.database.delete_cached_responses(kind, page_id, cache_key)
+
+
+def cached_footer(age):
+    """Footer text for an answer served from the cache"""
+    return f"Cached {age:.0f}s ago"
+
+
+# Global response cache
+response_cache = ResponseCache(db)
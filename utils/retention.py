@@ -0,0 +1,134 @@
+"""
+Retention engine for analytics snapshots and post history
+Downsamples old snapshots, retires old finished posts, jobs and cached responses in small batches, then frees the space
+
+Run from the project root: python -m utils.retention [--enable-incremental-vacuum]
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+import config
+
+# strftime() format and modifiers bucketing each ANALYTICS_RETENTION resolution;
+# weeks are keyed by their Monday so the week spanning New Year stays one bucket
+BUCKETS = {
+    'hour': ('%Y-%m-%d %H',),
+    'day': ('%Y-%m-%d',),
+    'week': ('%Y-%m-%d', 'weekday 0', '-6 days'),
+}
+
+
+class RetentionEngine:
+    """Periodically applies the retention policy without holding the write lock for long"""
+
+    def __init__(self):
+        self.task = None
+
+    async def batches(self, delete):
+        """Call delete() until a batch comes back short, pausing between them; returns rows removed"""
+        removed = 0
+        while True:
+            count = await delete()
+            removed += count
+            if count < config.RETENTION_BATCH_SIZE:
+                return removed
+            await asyncio.sleep(config.RETENTION_BATCH_PAUSE)
+
+    async def downsample(self, db, now):
+        """Keep each post's newest snapshot per bucket, coarser buckets for older snapshots"""
+        removed = 0
+        tiers = config.ANALYTICS_RETENTION
+        for i, (age, resolution) in enumerate(tiers):
+            # Each tier covers the ages up to the next, coarser tier
+            since = now - timedelta(seconds=tiers[i + 1][0]) if i + 1 < len(tiers) else datetime.min
+            before = now - timedelta(seconds=age)
+            ids = await db.find_downsampled_analytics(since, before, *BUCKETS[resolution])
+            for start in range(0, len(ids), config.RETENTION_BATCH_SIZE):
+                removed += await db.delete_facebook_analytics(ids[start:start + config.RETENTION_BATCH_SIZE])
+                await asyncio.sleep(config.RETENTION_BATCH_PAUSE)
+        return removed
+
+    async def vacuum(self, db):
+        """Hand freed pages back to the OS a step at a time"""
+        # Without incremental auto_vacuum the pragma is a no-op and the freelist never shrinks
+        if not await db.incremental_vacuum_enabled():
+            print('Database is not in incremental auto_vacuum, freed pages stay in the file '
+                  '(run python -m utils.retention --enable-incremental-vacuum while the bot is stopped)')
+            return
+        remaining = None
+        while True:
+            free = await db.incremental_vacuum(config.RETENTION_VACUUM_PAGES)
+            if not free or (remaining is not None and free >= remaining):
+                return
+            remaining = free
+            await asyncio.sleep(config.RETENTION_BATCH_PAUSE)
+
+    async def run_once(self, db):
+        """Apply the whole policy once; returns rows removed per table"""
+        now = datetime.utcnow()
+        stats = {
+            'snapshots': await self.downsample(db, now),
+            'posts': await self.batches(lambda: db.retire_facebook_posts(
+                now - timedelta(days=config.POST_RETENTION_DAYS),
+                config.RETENTION_BATCH_SIZE,
+                prune=config.POST_RETENTION_MODE == 'prune'
+            )),
+            'jobs': await self.batches(lambda: db.prune_publish_jobs(
+                now - timedelta(days=config.PUBLISH_JOB_RETENTION_DAYS),
+                config.RETENTION_BATCH_SIZE
+            )),
+            # Past the stale TTL a cached response can't be served any more
+            'cache': await self.batches(lambda: db.prune_cached_responses(
+                time.time() - config.RESPONSE_CACHE_STALE_TTL,
+                config.RETENTION_BATCH_SIZE
+            )),
+        }
+        await self.vacuum(db)
+        print(f"Retention removed {stats['snapshots']} snapshots, "
+              f"{stats['posts']} posts ({config.POST_RETENTION_MODE}), {stats['jobs']} publish jobs, "
+              f"{stats['cache']} cached responses")
+        return stats
+
+    async def run(self, db):
+        while True:
+            try:
+                await self.run_once(db)
+            except Exception as e:
+                print(f'Error applying retention: {e}')
+            await asyncio.sleep(config.RETENTION_INTERVAL)
+
+    def start(self, db):
+        if not self.task or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self.run(db))
+            print(f'Retention engine started (runs every {config.RETENTION_INTERVAL}s)')
+
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+
+# Global retention engine
+retention = RetentionEngine()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply the retention policy once')
+    parser.add_argument('--enable-incremental-vacuum', action='store_true',
+                        help='first convert the database to auto_vacuum=INCREMENTAL with one full VACUUM; '
+                             'it holds the write lock throughout, so stop the bot first')
+    args = parser.parse_args()
+
+    from utils.database import db
+    try:
+        if args.enable_incremental_vacuum and not db.sync.enable_incremental_vacuum():
+            print('Database already uses incremental auto_vacuum')
+        asyncio.run(retention.run_once(db))
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,57 @@
 """
 Post scheduler for scheduled Facebook posts
-Uses APScheduler to check and publish scheduled posts
+Sleeps on an in-memory min-heap until the next post is due;
+APScheduler only runs a slow safety sweep for expired leases
 """
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from datetime import datetime
 import asyncio
+import heapq
+import config
+
+
+def parse_timestamp(value):
+    """Parse a TIMESTAMP column value returned by SQLite"""
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+class PostLease:
+    """Keeps a claimed post's lease alive while it waits for a slot and publishes"""
+    
+    def __init__(self, db, post):
+        self.db = db
+        self.post = post
+        self.lock = asyncio.Lock()
+        self.released = asyncio.Event()
+        self.task = asyncio.create_task(self.keep_alive())
+    
+    async def renew(self):
+        """Extend the lease; False once another claimer has taken the post"""
+        async with self.lock:
+            if self.post['lease_until'] is not None:
+                self.post['lease_until'] = await self.db.extend_facebook_post_lease(
+                    self.post['_id'], self.post['lease_until'], config.SCHEDULER_LEASE_SECONDS
+                )
+            return self.post['lease_until'] is not None
+    
+    async def keep_alive(self):
+        while not self.released.is_set():
+            try:
+                await asyncio.wait_for(self.released.wait(), config.SCHEDULER_LEASE_SECONDS / 3)
+            except asyncio.TimeoutError:
+                try:
+                    if not await self.renew():
+                        return
+                except Exception as e:
+                    print(f'Error renewing lease for scheduled post {self.post["_id"]}: {e}')
+    
+    async def release(self):
+        """Stop renewing; afterwards post['lease_until'] matches the database"""
+        self.released.set()
+        await self.task
 
 
 class PostScheduler:
@@ -15,6 +61,12 @@ class PostScheduler:
         self.scheduler = AsyncIOScheduler()
         self.facebook_callback = None
         self.is_running = False
+        self.workers = asyncio.Semaphore(config.SCHEDULER_MAX_WORKERS)
+        self.page_limits = {}  # page_id -> Semaphore
+        self.timer_heap = []  # (scheduled_at, post_id)
+        self.timer_task = None
+        self.wakeup = asyncio.Event()
+        self.checks = set()
     
     def start(self):
         """Start the scheduler"""
@@ -29,43 +81,141 @@ class PostScheduler:
             self.scheduler.shutdown()
             self.is_running = False
             print('Post scheduler stopped')
+        if self.timer_task:
+            self.timer_task.cancel()
+            self.timer_task = None
+        for check in self.checks:
+            check.cancel()
     
     def set_facebook_callback(self, callback):
         """Set the function to call when publishing Facebook posts"""
         self.facebook_callback = callback
         print('Facebook callback registered')
     
+    def notify(self, post_id, scheduled_at):
+        """Add a newly scheduled post to the timer"""
+        scheduled_at = parse_timestamp(scheduled_at)
+        is_next = not self.timer_heap or scheduled_at < self.timer_heap[0][0]
+        heapq.heappush(self.timer_heap, (scheduled_at, post_id))
+        if is_next:
+            self.wakeup.set()
+    
+    async def run_timer(self, db):
+        """Load upcoming posts once, then sleep until each one is due"""
+        upcoming = await db.get_facebook_upcoming_posts()
+        # Merge rather than replace, so posts notify()'d while the query ran keep their timers
+        self.timer_heap.extend((parse_timestamp(p['scheduled_at']), p['_id']) for p in upcoming)
+        heapq.heapify(self.timer_heap)
+        print(f'Post timer loaded {len(self.timer_heap)} upcoming posts')
+        
+        while True:
+            self.wakeup.clear()
+            now = datetime.utcnow()
+            
+            if self.timer_heap and self.timer_heap[0][0] <= now:
+                while self.timer_heap and self.timer_heap[0][0] <= now:
+                    heapq.heappop(self.timer_heap)
+                # Run in the background so later timers keep firing while this batch publishes
+                check = asyncio.create_task(self.check_scheduled_posts(db))
+                self.checks.add(check)
+                check.add_done_callback(self.checks.discard)
+                continue
+            
+            timeout = (self.timer_heap[0][0] - now).total_seconds() if self.timer_heap else None
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+    
     async def check_scheduled_posts(self, db):
         """Check for Facebook posts that need to be published"""
         if not self.facebook_callback:
             return
         
         try:
-            posts = db.get_facebook_scheduled_posts()
-            
-            if posts:
-                print(f'Found {len(posts)} scheduled posts to publish')
-            
-            for post in posts:
-                try:
-                    await self.facebook_callback(post)
-                except Exception as e:
-                    print(f'Error publishing scheduled post {post.get("_id")}: {e}')
+            while True:
+                # Claimed rows are leased to us, so no other check or process republishes them
+                posts = await db.claim_facebook_scheduled_posts(
+                    config.SCHEDULER_CLAIM_BATCH,
+                    config.SCHEDULER_LEASE_SECONDS
+                )
+                if not posts:
+                    break
+                
+                print(f'Claimed {len(posts)} scheduled posts to publish')
+                await self.dispatch(db, posts)
+                
+                if len(posts) < config.SCHEDULER_CLAIM_BATCH:
+                    break
         except Exception as e:
             print(f'Error checking scheduled posts: {e}')
     
+    async def dispatch(self, db, posts):
+        """Publish posts concurrently, capped globally and per page"""
+        async def run(post):
+            page_limit = self.page_limits.setdefault(
+                post.get('page_id'),
+                asyncio.Semaphore(config.SCHEDULER_MAX_PER_PAGE)
+            )
+            # Renew the lease for as long as the post is queued or publishing
+            lease = PostLease(db, post)
+            try:
+                # Wait for the page slot first so a busy page never holds a worker
+                async with page_limit:
+                    async with self.workers:
+                        return await self.publish(db, post, lease)
+            finally:
+                await lease.release()
+        
+        posts = sorted(posts, key=lambda p: parse_timestamp(p['scheduled_at']))
+        results = await asyncio.gather(*(run(p) for p in posts))
+        lateness = [value for value in results if value is not None]
+        if lateness:
+            print(f'Dispatched {len(lateness)} scheduled posts '
+                  f'(avg {sum(lateness) / len(lateness):.1f}s, max {max(lateness):.1f}s late)')
+        return lateness
+    
+    async def publish(self, db, post, lease):
+        """Run the callback for one post and return its lateness in seconds"""
+        # Only publish while we still hold the post; a reclaimed lease belongs to someone else now
+        if not await lease.renew():
+            print(f'Skipping scheduled post {post.get("_id")}, its lease was lost')
+            return None
+        
+        try:
+            fb_post_id = await self.facebook_callback(post)
+            status = 'published'
+        except Exception as e:
+            print(f'Error publishing scheduled post {post.get("_id")}: {e}')
+            fb_post_id, status = None, 'failed'
+        
+        await lease.release()
+        if post['lease_until'] is None:
+            print(f'Scheduled post {post.get("_id")} lease was lost while publishing, status {status} not recorded')
+            return None
+        recorded = await db.update_facebook_post_status(post['_id'], status, fb_post_id, post['lease_until'])
+        if not recorded or status != 'published':
+            return None
+        
+        lateness = (datetime.utcnow() - parse_timestamp(post['scheduled_at'])).total_seconds()
+        print(f'Scheduled post {post.get("_id")} handled {lateness:.1f}s after scheduled_at')
+        return lateness
+    
     def schedule_check(self, db):
-        """Schedule periodic checks for posts"""
+        """Start the post timer and the periodic safety sweep"""
+        if not self.timer_task or self.timer_task.done():
+            self.timer_task = asyncio.get_running_loop().create_task(self.run_timer(db))
+        
         if not self.scheduler.get_job('check_facebook_posts'):
             self.scheduler.add_job(
                 self.check_scheduled_posts,
                 'interval',
-                minutes=1,
+                seconds=config.SCHEDULER_CHECK_INTERVAL,
                 args=[db],
                 id='check_facebook_posts',
-                name='Check Facebook Scheduled Posts'
+                name='Sweep Facebook Scheduled Posts'
             )
-            print('Scheduled post checker configured (runs every 1 minute)')
+            print(f'Scheduled post sweep configured (runs every {config.SCHEDULER_CHECK_INTERVAL}s)')
 
 
 # Global scheduler
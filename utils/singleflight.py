@@ -0,0 +1,32 @@
+"""
+Request coalescing for Facebook Discord Bot
+Concurrent identical calls share a single upstream call and result
+"""
+
+import asyncio
+
+
+class SingleFlight:
+    """Runs one call per key at a time and hands its result to every caller"""
+
+    def __init__(self):
+        self.calls = {}  # key -> Task
+        self.shared = 0
+
+    async def do(self, key, func):
+        """Await func(), or join the call already in flight for this key"""
+        task = self.calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self.calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.shared += 1
+        # Shield so one caller giving up does not cancel the call for the others
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        if self.calls.get(key) is task:
+            del self.calls[key]
+        if not task.cancelled():
+            task.exception()  # Mark as retrieved even if every caller gave up